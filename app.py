@@ -1,55 +1,136 @@
-from flask import Flask, render_template, request, send_file, flash, redirect, url_for, session, after_this_request
+from flask import Flask, Request, Response, render_template, request, send_file, flash, redirect, url_for, session, after_this_request, jsonify
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
+from tempfile import SpooledTemporaryFile
 import os
-import asyncio
-from scrapers.niggrid_scraper import run_scraper
-from scrapers.flight_processor import process_flight_files
-from scrapers.cargo_processor import process_cargo_files
-from scrapers.weekly_flight_processor import process_weekly_flights
+import importlib
 import io
-
+from profiling import profiled
+from scrapers.progress import open_channel, valid_job_id, job_exists, stream_events
+
+
+# --- UPLOAD LIMITS ---
+# Sizes in MB, overridable through the environment.
+MAX_UPLOAD_FILE_MB = int(os.environ.get('MAX_UPLOAD_FILE_MB', 100))          # Per file
+MAX_UPLOAD_REQUEST_MB = int(os.environ.get('MAX_UPLOAD_REQUEST_MB', 500))    # Per request
+UPLOAD_SPOOL_THRESHOLD_MB = int(os.environ.get('UPLOAD_SPOOL_THRESHOLD_MB', 1)) # Larger files go to disk
+
+class LimitedSpooledFile(SpooledTemporaryFile):
+    """Upload buffer that rolls over to disk and rejects files above the per-file limit."""
+    def __init__(self, max_size, max_file_size):
+        super().__init__(max_size=max_size, mode='w+b')
+        self.max_file_size = max_file_size
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        if self.bytes_written > self.max_file_size:
+            raise RequestEntityTooLarge(f"Each file must be smaller than {MAX_UPLOAD_FILE_MB} MB.")
+        return super().write(data)
+
+class SpooledRequest(Request):
+    """Streams every uploaded file into a size-limited spooled temp file."""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return LimitedSpooledFile(
+            max_size=UPLOAD_SPOOL_THRESHOLD_MB * 1024 * 1024,
+            max_file_size=MAX_UPLOAD_FILE_MB * 1024 * 1024
+        )
 
 app = Flask(__name__)
+app.request_class = SpooledRequest
 app.secret_key = 'super_secret_key' # Needed for flashing messages
-DOWNLOAD_FOLDER = os.path.join(os.getcwd(), 'downloads')
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_REQUEST_MB * 1024 * 1024
+DOWNLOAD_FOLDER = os.environ.get('DOWNLOAD_FOLDER', os.path.join(os.getcwd(), 'downloads'))
 
 # Create downloads folder if not exists
 if not os.path.exists(DOWNLOAD_FOLDER):
     os.makedirs(DOWNLOAD_FOLDER)
 
+# --- LAZY PROCESSOR LOADING ---
+# The processor modules pull in pandas, pdfplumber, openpyxl, bs4/lxml and requests.
+# They are only imported when their route is first used, so a worker that just
+# serves the dashboard stays small and boots fast.
+PROCESSORS = {
+    'run_scraper': ('scrapers.niggrid', 'run_scraper'),
+    'process_flight_files': ('scrapers.flight_processor', 'process_flight_files'),
+    'process_flight_files_by_month': ('scrapers.flight_processor', 'process_flight_files_by_month'),
+    'process_cargo_files': ('scrapers.cargo_processor', 'process_cargo_files'),
+    'export_cargo_master': ('scrapers.cargo_processor', 'export_cargo_master'),
+    'process_weekly_flights': ('scrapers.weekly_flight_processor', 'process_weekly_flights'),
+}
+
+def get_processor(name):
+    """Imports the processor module on first use and returns the function."""
+    module_name, func_name = PROCESSORS[name]
+    return getattr(importlib.import_module(module_name), func_name)
+
+def preload_processors():
+    """Imports every processor up front (e.g. for `gunicorn --preload`)."""
+    for name in PROCESSORS:
+        get_processor(name)
+
+# PRELOAD_PROCESSORS=1 restores eager loading. Combined with `gunicorn --preload`
+# the heavy modules are imported once in the master and shared with the workers.
+if os.environ.get('PRELOAD_PROCESSORS', '0') == '1':
+    preload_processors()
+
+# NIGGRID_SCHEDULER=1 pre-scrapes each published day into the local store in a
+# background thread (only one worker process runs it). Cron can run
+# `python batch.py niggrid-sync` instead.
+if os.environ.get('NIGGRID_SCHEDULER', '0') == '1':
+    from scrapers.niggrid_scheduler import start_scheduler
+    start_scheduler()
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    flash(f"Upload too large: {e.description} Limits are {MAX_UPLOAD_FILE_MB} MB per file "
+          f"and {MAX_UPLOAD_REQUEST_MB} MB per request.", "error")
+    return redirect(request.path)
+
 @app.route('/')
 def dashboard():
     return render_template('index.html')
 
 @app.route('/niggrid', methods=['GET', 'POST'])
+@profiled('niggrid', DOWNLOAD_FOLDER)
 def niggrid_tool():
     if request.method == 'POST':
         start_date = request.form['start_date']
         end_date = request.form['end_date']
+        export_format = request.form.get('format', 'xlsx')
+        progress = open_channel(request.args.get('job_id')) # Streamed by /progress/<job_id>
+        status = 'failed'
         
         try:
-            # Run the async scraper from sync Flask code
-            filename = asyncio.run(run_scraper(start_date, end_date, DOWNLOAD_FOLDER))
-            # filename = run_scraper(start_date, end_date, DOWNLOAD_FOLDER)
+            # Stored days come from the local NIGGRID store; only missing days are scraped
+            filename = get_processor('run_scraper')(start_date, end_date, DOWNLOAD_FOLDER, fmt=export_format, progress=progress)
             
             if filename:
+                status = 'ok'
                 return send_file(os.path.join(DOWNLOAD_FOLDER, filename), as_attachment=True)
             else:
+                status = 'empty'
                 flash("No data found for that range.", "error")
                 return redirect(url_for('niggrid_tool'))
                 
         except Exception as e:
             flash(f"Error running script: {str(e)}", "error")
             return redirect(url_for('niggrid_tool'))
+        finally:
+            if progress:
+                progress.close(status)
 
     return render_template('niggrid.html')
 
 @app.route('/flight_data', methods=['GET', 'POST'])
+@profiled('flight', DOWNLOAD_FOLDER)
 def flight_tool():
     if request.method == 'POST':
         try:
             # 1. Get Inputs
+            mode = request.form.get('mode', 'single')
             target_month = request.form.get('month')
             target_year = request.form.get('year')
+            export_format = request.form.get('format', 'xlsx') # xlsx, parquet or csv.gz
             uploaded_files = request.files.getlist('files') # Get multiple files
             
             if not uploaded_files or uploaded_files[0].filename == '':
@@ -57,11 +138,24 @@ def flight_tool():
                 return redirect(url_for('flight_tool'))
 
             # 2. Process
-            filename = process_flight_files(uploaded_files, target_month, target_year, DOWNLOAD_FOLDER)
+            stats = {}
+            if mode == 'multi':
+                # Months come from the files themselves; one sheet per month plus Combined
+                filename = get_processor('process_flight_files_by_month')(uploaded_files, DOWNLOAD_FOLDER, stats=stats, fmt=export_format)
+            else:
+                filename = get_processor('process_flight_files')(uploaded_files, target_month, target_year, DOWNLOAD_FOLDER, stats=stats, fmt=export_format)
             
             if filename:
                 session['latest_flight_file'] = filename
                 flash("Processing completed successfully!", "success")
+                if stats.get('months'):
+                    flash(f"Months in the report: {', '.join(stats['months'])}", "success")
+                if stats.get('undated_files'):
+                    flash(f"Skipped (no takeoff date to tell the month): {', '.join(stats['undated_files'])}", "error")
+                if stats.get('duplicates_dropped'):
+                    flash(f"Removed {stats['duplicates_dropped']} duplicate flight record(s) found in overlapping files.", "success")
+                if stats.get('unchecked_files'):
+                    flash(f"Not checked for duplicates (missing key columns): {', '.join(stats['unchecked_files'])}", "error")
                 return redirect(url_for('flight_tool'))
                 # return redirect(url_for('download_flight', filename=filename))
                 # return send_file(os.path.join(DOWNLOAD_FOLDER, filename), as_attachment=True)
@@ -69,6 +163,8 @@ def flight_tool():
                 flash("Processing failed or files were empty.", "error")
                 return redirect(url_for('flight_tool'))
 
+        except HTTPException:
+            raise # e.g. upload too large: see upload_too_large
         except Exception as e:
             flash(f"Error: {str(e)}", "error")
             return redirect(url_for('flight_tool'))
@@ -104,30 +200,47 @@ def download_flight():
     )
 
 @app.route('/cargo_manifest', methods=['GET', 'POST'])
+@profiled('cargo', DOWNLOAD_FOLDER)
 def cargo_tool():
     if request.method == 'POST':
+        # From the query string, so the job exists before the upload body is read
+        progress = open_channel(request.args.get('job_id')) # Streamed by /progress/<job_id>
+        status = 'failed'
+        if progress:
+            progress('start', "Receiving upload")
         try:
             uploaded_files = request.files.getlist('files')
+            export_format = request.form.get('format', 'xlsx')
             
             if not uploaded_files or uploaded_files[0].filename == '':
                 flash("No PDF files selected!", "error")
                 return redirect(url_for('cargo_tool'))
 
-            # Process
-            zip_filename = process_cargo_files(uploaded_files, DOWNLOAD_FOLDER)
+            # Process (manifests already in the cargo master store are not parsed again)
+            stats = {}
+            zip_filename = get_processor('process_cargo_files')(uploaded_files, DOWNLOAD_FOLDER, fmt=export_format, stats=stats, progress=progress)
             
             if zip_filename:
+                status = 'ok'
                 session['latest_cargo_file'] = zip_filename
                 flash("Processing completed successfully!", "success")
+                flash(f"Cargo master: {stats.get('parsed', 0)} new manifest(s) parsed "
+                      f"({stats.get('rows_added', 0)} rows added, {stats.get('rows_updated', 0)} updated), "
+                      f"{stats.get('reused', 0)} already stored.", "success")
                 return redirect(url_for('cargo_tool'))
                 # return send_file(os.path.join(DOWNLOAD_FOLDER, zip_filename), as_attachment=True)
             else:
                 flash("Processing failed. Please check if PDFs contain valid tables.", "error")
                 return redirect(url_for('cargo_tool'))
 
+        except HTTPException:
+            raise # e.g. upload too large: see upload_too_large
         except Exception as e:
             flash(f"System Error: {str(e)}", "error")
             return redirect(url_for('cargo_tool'))
+        finally:
+            if progress:
+                progress.close(status)
 
     return render_template('cargo_manifest.html')
 
@@ -157,18 +270,38 @@ def download_cargo():
         as_attachment=True
     )
 
+@app.route('/download_cargo_master')
+def download_cargo_master():
+    """Running cargo master from the store (?format=xlsx|parquet|csv.gz)."""
+    filepath, download_name = get_processor('export_cargo_master')(DOWNLOAD_FOLDER, request.args.get('format', 'xlsx'))
+    if not filepath:
+        flash("The cargo master is empty. Process some manifests first.", "error")
+        return redirect(url_for('cargo_tool'))
+
+    with open(filepath, "rb") as f:
+        file_data = f.read()
+    os.remove(filepath)
+
+    return send_file(
+        io.BytesIO(file_data),
+        download_name=download_name,
+        as_attachment=True
+    )
+
 @app.route('/weekly_flight_data', methods=['GET', 'POST'])
+@profiled('weekly', DOWNLOAD_FOLDER)
 def weekly_flight_tool():
     if request.method == 'POST':
         try:
             uploaded_files = request.files.getlist('files')
+            export_format = request.form.get('format', 'xlsx')
             
             if not uploaded_files or uploaded_files[0].filename == '':
                 flash("No files uploaded!", "error")
                 return redirect(url_for('weekly_flight_tool'))
 
             # Process
-            filename = process_weekly_flights(uploaded_files, DOWNLOAD_FOLDER)
+            filename = get_processor('process_weekly_flights')(uploaded_files, DOWNLOAD_FOLDER, fmt=export_format)
             
             if filename:
                 return send_file(os.path.join(DOWNLOAD_FOLDER, filename), as_attachment=True)
@@ -176,11 +309,150 @@ def weekly_flight_tool():
                 flash("Processing failed. Please check files.", "error")
                 return redirect(url_for('weekly_flight_tool'))
 
+        except HTTPException:
+            raise # e.g. upload too large: see upload_too_large
         except Exception as e:
             flash(f"System Error: {str(e)}", "error")
             return redirect(url_for('weekly_flight_tool'))
 
     return render_template('weekly_flight_data.html')
 
+# --- PROGRESS EVENTS ---
+# The NIGGRID and cargo forms post to ?job_id=<id> (generated in the browser)
+# and open an EventSource on /progress/<id>. Until the POST has created the
+# job the stream answers 204 at once, which closes the EventSource; the page
+# reconnects with a backoff. A stream then holds a connection for the rest of
+# the job, hence the gthread workers in gunicorn.conf.py.
+@app.route('/progress/<job_id>')
+def progress_stream(job_id):
+    """Server-sent events of one tool request (see scrapers/progress.py)."""
+    if not valid_job_id(job_id):
+        return api_error("Invalid job id", 400)
+    if not job_exists(job_id):
+        return Response(status=204) # Not started yet; never block a worker waiting for it
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        last_event_id = 0
+    return Response(stream_events(job_id, last_event_id), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no', # Don't let nginx buffer the stream
+    })
+
+# --- JSON AGGREGATE API ---
+# Read-only tables for dashboard charts. Each response carries a strong ETag
+# computed from its input files and query parameters; a matching
+# If-None-Match gets a 304 before any table is loaded.
+API_DEFAULT_PER_PAGE = 500
+API_MAX_PER_PAGE = 5000
+
+def api_query_params():
+    """page / per_page / columns from the query string (raises ValueError on bad input)."""
+    page = int(request.args.get('page', 1))
+    per_page = min(int(request.args.get('per_page', API_DEFAULT_PER_PAGE)), API_MAX_PER_PAGE)
+    if page < 1 or per_page < 1:
+        raise ValueError("page and per_page must be positive")
+    columns = [c.strip() for c in request.args.get('columns', '').split(',') if c.strip()]
+    return page, per_page, columns
+
+def api_error(message, status):
+    return jsonify({'error': message}), status
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def json_with_etag(payload, etag):
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache' # Always revalidate; 304s are nearly free
+    return response
+
+def serve_table(input_paths, params, load_table):
+    """Shared ETag / pagination flow. load_table() is only called on a cache miss."""
+    from scrapers.aggregates import make_etag, paginate
+    try:
+        page, per_page, columns = api_query_params()
+    except ValueError as e:
+        return api_error(str(e), 400)
+
+    params = dict(params, page=page, per_page=per_page, columns=columns)
+    etag = make_etag(input_paths, params)
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
+
+    table = load_table()
+    try:
+        payload = paginate(table, page, per_page, columns)
+    except KeyError as e:
+        return api_error(e.args[0], 400)
+    payload.update({k: v for k, v in params.items() if k not in payload})
+    return json_with_etag(payload, etag)
+
+@app.route('/api/niggrid')
+def api_niggrid():
+    """Station x day pivot from the local NIGGRID store (never scrapes)."""
+    from scrapers.niggrid_store import NIGGRID_DATA_FOLDER, stored_day_path
+    from scrapers.niggrid import get_date_range, stored_pivot
+    start_date = request.args.get('start')
+    end_date = request.args.get('end')
+    if not start_date or not end_date:
+        return api_error("start and end (YYYY-MM-DD) are required", 400)
+    try:
+        days = get_date_range(start_date, end_date)
+    except ValueError:
+        return api_error("start and end must be YYYY-MM-DD", 400)
+
+    input_paths = [stored_day_path(d, NIGGRID_DATA_FOLDER) for d in days]
+    input_paths = [p for p in input_paths if p]
+    if not input_paths:
+        return api_error("No stored NIGGRID days in that range", 404)
+
+    def load_table():
+        pivot = stored_pivot(start_date, end_date, NIGGRID_DATA_FOLDER)
+        return pivot.reset_index().rename(columns={'index': 'Station_Name'})
+
+    params = {'table': 'niggrid', 'start': start_date, 'end': end_date, 'stored_days': len(input_paths)}
+    return serve_table(input_paths, params, load_table)
+
+@app.route('/api/<kind>')
+def api_aggregate(kind):
+    """
+    Latest (or ?name=) flight report, weekly summary or cargo master. For cargo
+    the default (or ?name=master) is the running master from the cargo store.
+    """
+    from scrapers.aggregates import AGGREGATE_KINDS, resolve_aggregate, load_aggregate
+    if kind not in AGGREGATE_KINDS:
+        return api_error(f"Unknown table '{kind}'", 404)
+    name = request.args.get('name')
+    if kind == 'cargo' and name in (None, 'master'):
+        from scrapers.cargo_store import master_path
+        path = master_path()
+        if os.path.exists(path):
+            return serve_table([path], {'table': kind, 'name': 'master'}, lambda: load_aggregate(path))
+        if name == 'master':
+            return api_error("The cargo master store is empty", 404)
+    path = resolve_aggregate(kind, name)
+    if path is None:
+        return api_error(f"No {kind} report available", 404)
+
+    name = os.path.basename(path)[:-len('.pkl')]
+    params = {'table': kind, 'name': name}
+    return serve_table([path], params, lambda: load_aggregate(path))
+
+@app.route('/api/<kind>/reports')
+def api_aggregate_list(kind):
+    from scrapers.aggregates import AGGREGATE_KINDS, list_aggregates
+    if kind not in AGGREGATE_KINDS:
+        return api_error(f"Unknown table '{kind}'", 404)
+    reports = list_aggregates(kind)
+    if kind == 'cargo':
+        from scrapers.cargo_store import master_path
+        if os.path.exists(master_path()):
+            reports = ['master'] + reports
+    return jsonify({'table': kind, 'reports': reports})
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,366 @@
+"""
+Headless batch runner for backfills.
+
+Runs the same processors as the web routes over local directories or date
+ranges, spreading the work over a process pool, and writes the same report
+files into --out.
+
+    python batch.py flight  EXPORTS/2025-01 EXPORTS/2025-02 ... --out reports
+    python batch.py flight  EXPORTS/march --month 2025-03 --out reports
+    python batch.py weekly  WEEK_DIR [WEEK_DIR ...] --out reports   (-> reports/weekly/<WEEK_DIR>/)
+    python batch.py cargo   MANIFEST_DIR_OR_PDF [...] --out reports
+    python batch.py niggrid --start 2025-01-01 --end 2025-12-31 --out reports
+    python batch.py niggrid-sync [--days 14]      (cron: fill the local NIGGRID store)
+
+Flight directories hold one month of daily exports; the month comes from
+--month or from a YYYY-MM in the directory name. NIGGRID ranges are split into
+calendar months, one report per month.
+
+Completed jobs are recorded in <out>/.batch_state.json. Re-running the same
+command after an interruption skips them (use --no-resume to redo everything).
+"""
+import argparse
+import calendar
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+STATE_FILENAME = '.batch_state.json'
+CARGO_PARTS_DIR = '.cargo_parts'
+FLIGHT_EXTENSIONS = ('.csv', '.tsv', '.txt')
+NIGGRID_DEFAULT_WORKERS = 2
+EXPORT_FORMATS = ['xlsx', 'parquet', 'csv.gz'] # Same as scrapers.exporters (not imported: it pulls in pandas)
+
+# --- RESUME STATE ---
+def load_state(out_dir):
+    path = os.path.join(out_dir, STATE_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(out_dir, state):
+    """Atomic write, so an interrupted run never leaves a truncated state file."""
+    path = os.path.join(out_dir, STATE_FILENAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def is_done(state, key, out_dir):
+    """A job counts as done only if its recorded output still exists."""
+    outputs = state.get(key)
+    if not outputs:
+        return False
+    return all(os.path.exists(os.path.join(out_dir, o)) for o in outputs)
+
+# --- INPUT DISCOVERY ---
+def list_files(path, extensions):
+    if os.path.isfile(path):
+        return [path] if path.lower().endswith(extensions) else []
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if name.lower().endswith(extensions) and os.path.isfile(os.path.join(path, name))
+    )
+
+def parse_month(text):
+    """'2025-03' / '2025_3' / 'exports-2025-03' -> (3, 2025)"""
+    match = re.search(r'(\d{4})[-_](\d{1,2})(?!\d)', text)
+    if not match:
+        return None
+    year, month = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+    return month, year
+
+def source_tag(path):
+    """Short stable tag of a source path, to tell apart inputs that share a name."""
+    return hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+
+def unique_names(paths):
+    """Basename of each path; a name shared by several paths gets its source_tag appended."""
+    names = [os.path.basename(os.path.normpath(p)) for p in paths]
+    counts = Counter(names)
+    unique = []
+    for path, name in zip(paths, names):
+        if counts[name] > 1:
+            stem, ext = os.path.splitext(name)
+            name = f"{stem}_{source_tag(path)}{ext}"
+        unique.append(name)
+    return unique
+
+def parse_columns(text):
+    """'Flight_ID, date_takeoff' -> ['flight_id', 'date_takeoff']"""
+    return [c.strip().lower() for c in text.split(',') if c.strip()]
+
+def month_ranges(start_str, end_str):
+    """Splits an inclusive date range into (start, end) strings per calendar month."""
+    start = datetime.strptime(start_str, "%Y-%m-%d").date()
+    end = datetime.strptime(end_str, "%Y-%m-%d").date()
+    ranges = []
+    current = start
+    while current <= end:
+        last_day = date(current.year, current.month, calendar.monthrange(current.year, current.month)[1])
+        chunk_end = min(last_day, end)
+        ranges.append((current.isoformat(), chunk_end.isoformat()))
+        current = chunk_end + timedelta(days=1)
+    return ranges
+
+# --- JOBS (run inside the pool, so they must be top-level functions) ---
+def open_all(paths):
+    return [open(p, 'rb') for p in paths]
+
+def close_all(files):
+    for f in files:
+        f.close()
+
+def flight_job(paths, month, year, out_dir, dedup_key=None, fmt='xlsx'):
+    from scrapers.flight_processor import process_flight_files
+    files = open_all(paths)
+    stats = {}
+    try:
+        filename = process_flight_files(files, month, year, out_dir, dedup_key=dedup_key, stats=stats, fmt=fmt)
+    finally:
+        close_all(files)
+    if stats.get('unchecked_files'):
+        print(f"Not checked for duplicates (missing key columns): {', '.join(stats['unchecked_files'])}")
+    return [filename] if filename else []
+
+def weekly_job(paths, out_dir, subdir, fmt='xlsx'):
+    """Summaries are timestamped to the second, so each directory gets its own subfolder."""
+    from scrapers.weekly_flight_processor import process_weekly_flights
+    target_dir = os.path.join(out_dir, subdir)
+    os.makedirs(target_dir, exist_ok=True)
+    files = open_all(paths)
+    try:
+        filename = process_weekly_flights(files, target_dir, fmt)
+    finally:
+        close_all(files)
+    return [os.path.join(subdir, filename)] if filename else []
+
+def cargo_job(path, out_dir, fmt='xlsx', store_folder=None, name=None):
+    """
+    Cleans one manifest and keeps its rows next to the cleaned file for the final
+    bundle. With a store folder, stored manifests are not parsed again and new
+    ones are upserted into the cargo master.
+    name: manifest name for the cleaned file (default: the PDF's basename)
+    """
+    from scrapers.cargo_processor import clean_cargo_file, clean_cargo_file_stored
+    parts_dir = os.path.join(out_dir, CARGO_PARTS_DIR)
+    name = name or os.path.basename(path)
+    if store_folder:
+        out_path, df = clean_cargo_file_stored(path, name, parts_dir, fmt, store_folder)
+    else:
+        out_path, df = clean_cargo_file(path, name, parts_dir, fmt)
+    if df is None:
+        return []
+    pickle_path = out_path + '.pkl'
+    df.to_pickle(pickle_path)
+    return [os.path.relpath(out_path, out_dir), os.path.relpath(pickle_path, out_dir)]
+
+def niggrid_job(start_date, end_date, out_dir, fmt='xlsx'):
+    from scrapers.niggrid import run_scraper
+    filename = run_scraper(start_date, end_date, out_dir, fmt=fmt)
+    return [filename] if filename else []
+
+# --- RUNNER ---
+def run_jobs(jobs, out_dir, workers, resume):
+    """
+    jobs: list of (key, func, args)
+    Runs pending jobs in a process pool and records each one as it finishes.
+    Returns (state dict, number of failed jobs).
+    """
+    state = load_state(out_dir) if resume else {}
+    pending = [(key, func, args) for key, func, args in jobs if not (resume and is_done(state, key, out_dir))]
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        print(f"Resuming: {skipped} of {len(jobs)} jobs already done")
+    if not pending:
+        return state, 0
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(func, *args): key for key, func, args in pending}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                outputs = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"[failed] {key}: {e}")
+                continue
+            if outputs:
+                state[key] = outputs
+                save_state(out_dir, state)
+                print(f"[done]   {key} -> {', '.join(outputs)}")
+            else:
+                print(f"[empty]  {key}: no data")
+
+    if failures:
+        print(f"{failures} job(s) failed; re-run the same command to retry them")
+    return state, failures
+
+def job_key(args, key):
+    """Resume key; non-Excel runs get their own, so switching --format redoes the work."""
+    return key if args.format == 'xlsx' else f"{key}:{args.format}"
+
+def build_flight_jobs(args):
+    """One job per directory. Each month has a single report file, so two directories for the same month are refused."""
+    jobs = []
+    targets = {}
+    for directory in args.paths:
+        if args.month:
+            period = parse_month(args.month)
+        else:
+            period = parse_month(os.path.basename(os.path.normpath(directory)))
+        if not period:
+            sys.exit(f"Cannot tell the month of {directory}; name it YYYY-MM or pass --month")
+        month, year = period
+        paths = list_files(directory, FLIGHT_EXTENSIONS)
+        if paths:
+            if period in targets:
+                sys.exit(f"{targets[period]} and {directory} would both write the {year}-{month:02d} report; "
+                         f"put that month's exports in one directory or run them separately")
+            targets[period] = directory
+            jobs.append((job_key(args, f"flight:{year}-{month:02d}:{os.path.abspath(directory)}"), flight_job, (paths, month, year, args.out, args.dedup_key, args.format)))
+    return jobs
+
+def build_weekly_jobs(args):
+    jobs = []
+    for directory, name in zip(args.paths, unique_names(args.paths)):
+        paths = list_files(directory, FLIGHT_EXTENSIONS)
+        if paths:
+            subdir = os.path.join('weekly', name)
+            jobs.append((job_key(args, f"weekly:{os.path.abspath(directory)}"), weekly_job, (paths, args.out, subdir, args.format)))
+    return jobs
+
+def build_cargo_jobs(args):
+    os.makedirs(os.path.join(args.out, CARGO_PARTS_DIR), exist_ok=True)
+    store_folder = None
+    if args.use_store:
+        store_folder = args.store or os.environ.get('CARGO_STORE_FOLDER', os.path.join(os.getcwd(), 'data', 'cargo'))
+    pdf_paths, seen = [], set()
+    for path in args.paths:
+        for pdf_path in list_files(path, ('.pdf',)):
+            if os.path.abspath(pdf_path) not in seen:
+                seen.add(os.path.abspath(pdf_path))
+                pdf_paths.append(pdf_path)
+    # Manifests from different directories may share a name; their cleaned parts must not
+    return [
+        (job_key(args, f"cargo:{os.path.abspath(pdf_path)}"), cargo_job, (pdf_path, args.out, args.format, store_folder, name))
+        for pdf_path, name in zip(pdf_paths, unique_names(pdf_paths))
+    ]
+
+def build_niggrid_jobs(args):
+    return [
+        (job_key(args, f"niggrid:{start}:{end}"), niggrid_job, (start, end, args.out, args.format))
+        for start, end in month_ranges(args.start, args.end)
+    ]
+
+def niggrid_sync(args):
+    """
+    Fills the local NIGGRID store (meant for cron); runs sequentially to stay
+    polite. Exits non-zero when a published day is still missing afterwards.
+    """
+    from scrapers.niggrid_store import NIGGRID_DATA_FOLDER, recent_days, missing_days, is_published
+    from scrapers.niggrid import get_date_range, sync_days
+    store_folder = args.store or NIGGRID_DATA_FOLDER
+    if args.start and args.end:
+        days = get_date_range(args.start, args.end)
+    else:
+        days = recent_days(args.days)
+    saved = sync_days(days, store_folder)
+    print(f"Stored {len(saved)} new day(s) in {store_folder}")
+    failed = [d for d in missing_days(days, store_folder) if is_published(d)]
+    if failed:
+        print(f"{len(failed)} day(s) could not be fetched; re-run the same command to retry them")
+        return 1
+    return 0
+
+def bundle_cargo(jobs, state, out_dir, fmt='xlsx'):
+    """Merges every cleaned manifest of this run into the usual master ZIP."""
+    import pandas as pd
+    from scrapers.cargo_processor import bundle_cargo_results
+    processed_paths, master_dfs = [], []
+    for key, _, _ in jobs:
+        outputs = state.get(key)
+        if not outputs:
+            continue
+        xlsx_rel, pickle_rel = outputs
+        processed_paths.append(os.path.join(out_dir, xlsx_rel))
+        master_dfs.append(pd.read_pickle(os.path.join(out_dir, pickle_rel)))
+    if not master_dfs:
+        return None
+    return bundle_cargo_results(processed_paths, master_dfs, out_dir, cleanup=False, fmt=fmt)
+
+JOB_BUILDERS = {
+    'flight': build_flight_jobs,
+    'weekly': build_weekly_jobs,
+    'cargo': build_cargo_jobs,
+    'niggrid': build_niggrid_jobs,
+}
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--out', required=True, help='Folder for the report files')
+    common.add_argument('--workers', type=int, help='Processes in the pool (default: CPU count, 2 for niggrid)')
+    common.add_argument('--no-resume', dest='resume', action='store_false', help='Ignore previously completed jobs')
+    common.add_argument('--format', choices=EXPORT_FORMATS, default='xlsx', help='Output format (default: xlsx)')
+
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    flight = sub.add_parser('flight', parents=[common], help='Monthly flight reports, one per directory')
+    flight.add_argument('paths', nargs='+', help='Directories of daily exports, one month each')
+    flight.add_argument('--month', help='YYYY-MM for every directory (default: taken from the directory name)')
+    flight.add_argument('--dedup-key', type=parse_columns, help="Comma-separated columns identifying a flight ('' keeps duplicates; default: FLIGHT_DEDUP_KEY)")
+
+    weekly = sub.add_parser('weekly', parents=[common], help='Weekly flight summaries, one per directory')
+    weekly.add_argument('paths', nargs='+', help='Directories of daily exports')
+
+    cargo = sub.add_parser('cargo', parents=[common], help='Cargo manifests, merged into one ZIP')
+    cargo.add_argument('paths', nargs='+', help='PDF files or directories of PDFs')
+    cargo.add_argument('--store', help='Cargo master store folder (default: CARGO_STORE_FOLDER or data/cargo)')
+    cargo.add_argument('--no-store', dest='use_store', action='store_false', help="Don't read or update the cargo master store")
+
+    niggrid = sub.add_parser('niggrid', parents=[common], help='NIGGRID reports, one per calendar month')
+    niggrid.add_argument('--start', required=True, help='YYYY-MM-DD')
+    niggrid.add_argument('--end', required=True, help='YYYY-MM-DD')
+
+    sync = sub.add_parser('niggrid-sync', help='Fetch missing published NIGGRID days into the local store')
+    sync.add_argument('--days', type=int, default=14, help='Backfill window ending yesterday (default: 14)')
+    sync.add_argument('--start', help='YYYY-MM-DD (with --end, instead of --days)')
+    sync.add_argument('--end', help='YYYY-MM-DD')
+    sync.add_argument('--store', help='Store folder (default: NIGGRID_DATA_FOLDER or data/niggrid)')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'niggrid-sync':
+        return niggrid_sync(args)
+
+    os.makedirs(args.out, exist_ok=True)
+    if args.workers is None:
+        # Keep the load on niggrid.org modest; local work can use every core
+        args.workers = NIGGRID_DEFAULT_WORKERS if args.command == 'niggrid' else os.cpu_count()
+
+    jobs = JOB_BUILDERS[args.command](args)
+    if not jobs:
+        print("Nothing to process.")
+        return 1
+
+    state, failures = run_jobs(jobs, args.out, args.workers, args.resume)
+
+    if args.command == 'cargo':
+        zip_filename = bundle_cargo(jobs, state, args.out, args.format)
+        if zip_filename:
+            print(f"[done]   cargo bundle -> {zip_filename}")
+    return 1 if failures else 0 # Non-zero so cron / scripts see failed jobs
+
+if __name__ == '__main__':
+    sys.exit(main())
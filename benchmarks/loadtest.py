@@ -0,0 +1,393 @@
+"""
+HTTP load test: concurrent dashboard users against a running server.
+
+Each virtual user keeps its own cookie session and loops over a scenario,
+uploading synthetic files through the real routes:
+
+  flight   POST /flight_data (N daily CSVs)  -> GET /download_flight
+  weekly   POST /weekly_flight_data (N CSVs) -> workbook in the response
+  cargo    POST /cargo_manifest (N PDFs)     -> GET /download_cargo
+  niggrid  POST /niggrid (random past range) -> workbook in the response
+  mix      weighted random choice of the above (--mix)
+
+Reports throughput, p50/p95/p99 latency per route and, with --server-pid
+(the gunicorn master), the RSS of that process and its workers over time.
+
+Against an existing server (NIGGRID pointed at the stand-in):
+    python benchmarks/niggrid_standin.py --port 8765 &
+    NIGGRID_URL=http://127.0.0.1:8765/ NIGGRID_BACKEND=http NIGGRID_POLITE_DELAY=0,0 \\
+        gunicorn app:app -w 4 -b 127.0.0.1:8000 &
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --server-pid $! --concurrency 8 --duration 60
+
+Or let the harness start both (stand-in + gunicorn). The spawned server runs
+in a scratch folder: downloads, upload spools, aggregates, the NIGGRID and
+cargo stores and progress files all go there and are removed afterwards.
+    python benchmarks/loadtest.py --spawn --workers 4 --concurrency 8 --duration 60
+"""
+import argparse
+import csv
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from urllib.parse import urljoin
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import flight_export, cargo_manifest_pdf
+from niggrid_standin import start_standin
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ['flight', 'weekly', 'cargo', 'niggrid']
+REQUEST_TIMEOUT = 600
+
+# --- PAYLOADS ---
+def build_payloads(args):
+    """Generated once up front so client-side work doesn't skew latencies."""
+    month_start = date(2025, 3, 1)
+    flight = [
+        (f"flights_{month_start + timedelta(days=i):%Y-%m-%d}.csv",
+         flight_export(month_start + timedelta(days=i), args.flight_rows, seed=i))
+        for i in range(args.flight_files)
+    ]
+    cargo = [
+        (f"manifest_{i + 1}.pdf", cargo_manifest_pdf(pages=args.cargo_pages, seed=i))
+        for i in range(args.cargo_files)
+    ]
+    return {'flight': flight, 'cargo': cargo}
+
+def multipart(files, content_type):
+    return [('files', (name, data, content_type)) for name, data in files]
+
+# --- SCENARIOS ---
+# Each returns a list of (route, seconds, ok). A route counts as ok when it
+# produced the expected attachment, or for the upload-then-download tools,
+# when its redirect back to the page flashes the success message (failures
+# redirect there too). Only the request itself is timed, not the check.
+SUCCESS_FLASH = 'Processing completed successfully!'
+
+def timed(results, route, call, ok_check):
+    start = time.perf_counter()
+    try:
+        response = call()
+        seconds = time.perf_counter() - start
+        ok = ok_check(response)
+    except requests.RequestException:
+        seconds = time.perf_counter() - start
+        ok = False
+    results.append((route, seconds, ok))
+    return ok
+
+def is_attachment(response):
+    return response.status_code == 200 and 'attachment' in response.headers.get('Content-Disposition', '')
+
+def is_processed(session, page_path):
+    """Check for POSTs that redirect: back to page_path, and the page shows the success flash."""
+    def check(response):
+        location = urljoin(response.url, response.headers.get('Location', ''))
+        if response.status_code != 302 or not location.split('?')[0].endswith(page_path):
+            return False
+        page = session.get(location, timeout=REQUEST_TIMEOUT) # Consumes the flashed messages
+        return page.status_code == 200 and SUCCESS_FLASH in page.text
+    return check
+
+def run_flight(session, base_url, payloads, args, rng):
+    results = []
+    files = multipart(payloads['flight'], 'text/csv')
+    if timed(results, 'POST /flight_data',
+             lambda: session.post(f"{base_url}/flight_data", data={'month': '3', 'year': '2025'}, files=files,
+                                  allow_redirects=False, timeout=REQUEST_TIMEOUT), is_processed(session, '/flight_data')):
+        timed(results, 'GET /download_flight',
+              lambda: session.get(f"{base_url}/download_flight", allow_redirects=False, timeout=REQUEST_TIMEOUT), is_attachment)
+    return results
+
+def run_weekly(session, base_url, payloads, args, rng):
+    results = []
+    files = multipart(payloads['flight'], 'text/csv')
+    timed(results, 'POST /weekly_flight_data',
+          lambda: session.post(f"{base_url}/weekly_flight_data", files=files,
+                               allow_redirects=False, timeout=REQUEST_TIMEOUT), is_attachment)
+    return results
+
+def run_cargo(session, base_url, payloads, args, rng):
+    results = []
+    files = multipart(payloads['cargo'], 'application/pdf')
+    if timed(results, 'POST /cargo_manifest',
+             lambda: session.post(f"{base_url}/cargo_manifest", files=files,
+                                  allow_redirects=False, timeout=REQUEST_TIMEOUT), is_processed(session, '/cargo_manifest')):
+        timed(results, 'GET /download_cargo',
+              lambda: session.get(f"{base_url}/download_cargo", allow_redirects=False, timeout=REQUEST_TIMEOUT), is_attachment)
+    return results
+
+def run_niggrid(session, base_url, payloads, args, rng):
+    # Random ranges across two decades, so most days miss the local store and get scraped
+    start = date(2000, 1, 1) + timedelta(days=rng.randrange(7000))
+    end = start + timedelta(days=args.niggrid_days - 1)
+    results = []
+    timed(results, 'POST /niggrid',
+          lambda: session.post(f"{base_url}/niggrid", data={'start_date': start.isoformat(), 'end_date': end.isoformat()},
+                               allow_redirects=False, timeout=REQUEST_TIMEOUT), is_attachment)
+    return results
+
+SCENARIO_RUNNERS = {'flight': run_flight, 'weekly': run_weekly, 'cargo': run_cargo, 'niggrid': run_niggrid}
+
+def parse_mix(spec):
+    """'flight=3,cargo=1' -> (['flight', 'cargo'], [3.0, 1.0])"""
+    names, weights = [], []
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in SCENARIO_RUNNERS:
+            raise SystemExit(f"Unknown scenario in --mix: {name}")
+        names.append(name.strip())
+        weights.append(float(weight or 1))
+    return names, weights
+
+# --- WORKER RSS ---
+def process_tree(root_pid):
+    """root_pid plus all of its descendants, from /proc."""
+    children = defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        children[ppid].append(int(entry))
+
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+class RssSampler:
+    """Samples total and largest-worker RSS of a process tree at a fixed interval."""
+    def __init__(self, root_pid, interval):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.samples = [] # (elapsed_s, processes, total_mb, max_mb)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            sizes = [rss_mb(pid) for pid in process_tree(self.root_pid)]
+            sizes = [s for s in sizes if s]
+            if sizes:
+                self.samples.append((time.perf_counter() - self.started, len(sizes), sum(sizes), max(sizes)))
+            if self._stop.wait(self.interval):
+                break
+
+# --- SERVER ---
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_for_server(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(base_url + '/', timeout=2)
+            return True
+        except requests.RequestException:
+            time.sleep(0.25)
+    return False
+
+def spawn_server(args, scratch):
+    """
+    Stand-in + gunicorn, with every folder the app writes to inside scratch
+    (and scratch as its working directory), so a load run never touches the
+    real downloads/, data/ stores or aggregates. Returns (base_url, gunicorn
+    process, stand-in server).
+    """
+    standin_port = free_port()
+    standin = start_standin(standin_port, args.standin_latency_ms)
+
+    folders = {
+        'DOWNLOAD_FOLDER': 'downloads',
+        'TMPDIR': 'tmp', # Spooled uploads
+        'AGGREGATES_FOLDER': os.path.join('data', 'aggregates'),
+        'NIGGRID_DATA_FOLDER': os.path.join('data', 'niggrid'),
+        'CARGO_STORE_FOLDER': os.path.join('data', 'cargo'),
+        'PROGRESS_FOLDER': os.path.join('data', 'progress'),
+    }
+    env = os.environ.copy()
+    for name, folder in folders.items():
+        env[name] = os.path.join(scratch, folder)
+        os.makedirs(env[name], exist_ok=True)
+    env.update({
+        'NIGGRID_URL': f"http://127.0.0.1:{standin_port}/",
+        'NIGGRID_BACKEND': 'http',
+        'NIGGRID_POLITE_DELAY': '0,0',
+    })
+
+    port = free_port()
+    command = [
+        sys.executable, '-m', 'gunicorn', 'app:app', '-b', f"127.0.0.1:{port}",
+        '-c', os.path.join(REPO_ROOT, 'gunicorn.conf.py'), '--pythonpath', REPO_ROOT,
+        '-w', str(args.workers), '--threads', str(args.threads), '--timeout', str(REQUEST_TIMEOUT),
+    ] + shlex.split(args.gunicorn_args)
+    process = subprocess.Popen(command, cwd=scratch, env=env)
+
+    base_url = f"http://127.0.0.1:{port}"
+    if not wait_for_server(base_url):
+        process.terminate()
+        raise SystemExit("gunicorn did not come up")
+    return base_url, process, standin
+
+# --- RUN ---
+def virtual_user(user_id, base_url, payloads, args, deadline, counter, lock, results):
+    rng = random.Random(user_id)
+    session = requests.Session()
+    names, weights = parse_mix(args.mix) if args.scenario == 'mix' else ([args.scenario], [1])
+    while time.perf_counter() < deadline:
+        with lock:
+            if args.iterations and counter[0] >= args.iterations:
+                return
+            counter[0] += 1
+        scenario = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        steps = SCENARIO_RUNNERS[scenario](session, base_url, payloads, args, rng)
+        with lock:
+            results['steps'].extend(steps)
+            results['scenarios'].append((scenario, time.perf_counter() - start, all(ok for _, _, ok in steps)))
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def print_report(results, elapsed, sampler, args):
+    by_route = defaultdict(list)
+    errors = defaultdict(int)
+    for route, seconds, ok in results['steps']:
+        by_route[route].append(seconds)
+        if not ok:
+            errors[route] += 1
+
+    completed = [s for s in results['scenarios'] if s[2]]
+    print(f"\n{len(results['scenarios'])} iterations in {elapsed:.1f}s at concurrency {args.concurrency}: "
+          f"{len(completed) / elapsed:.2f} successful iterations/s, {len(results['steps']) / elapsed:.2f} requests/s")
+
+    print(f"\n{'route':<28}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for route in sorted(by_route):
+        values = sorted(by_route[route])
+        print(f"{route:<28}{len(values):>7}{errors[route]:>8}"
+              f"{percentile(values, 50) * 1000:>10.0f}{percentile(values, 95) * 1000:>10.0f}"
+              f"{percentile(values, 99) * 1000:>10.0f}{values[-1] * 1000:>10.0f}")
+
+    if not sampler or not sampler.samples:
+        return
+    samples = sampler.samples
+    step = max(1, len(samples) // 20) # Keep the printed timeline short
+    print(f"\n{'t (s)':>7}{'procs':>7}{'total RSS MB':>15}{'max worker MB':>15}")
+    for t, procs, total, largest in samples[::step]:
+        print(f"{t:>7.1f}{procs:>7}{total:>15.1f}{largest:>15.1f}")
+    print(f"Peak total RSS {max(s[2] for s in samples):.1f} MB, peak single process {max(s[3] for s in samples):.1f} MB")
+
+    if args.rss_csv:
+        with open(args.rss_csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['elapsed_s', 'processes', 'total_rss_mb', 'max_process_rss_mb'])
+            writer.writerows((round(t, 2), procs, round(total, 1), round(largest, 1)) for t, procs, total, largest in samples)
+        print(f"RSS timeline written to {args.rss_csv}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of a running server')
+    parser.add_argument('--scenario', choices=SCENARIOS + ['mix'], default='mix')
+    parser.add_argument('--mix', default='flight=3,weekly=2,cargo=2,niggrid=1', help='Scenario weights for --scenario mix')
+    parser.add_argument('--concurrency', type=int, default=4, help='Virtual users')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds to keep starting iterations')
+    parser.add_argument('--iterations', type=int, default=0, help='Stop after this many iterations in total (0 = no limit)')
+    parser.add_argument('--flight-files', type=int, default=7, help='Daily CSVs per flight/weekly upload')
+    parser.add_argument('--flight-rows', type=int, default=5000, help='Rows per daily CSV')
+    parser.add_argument('--cargo-files', type=int, default=2, help='PDFs per cargo upload')
+    parser.add_argument('--cargo-pages', type=int, default=6, help='Pages per PDF')
+    parser.add_argument('--niggrid-days', type=int, default=3, help='Days per NIGGRID request')
+    parser.add_argument('--server-pid', type=int, help='Server (gunicorn master) pid to sample RSS from')
+    parser.add_argument('--rss-interval', type=float, default=1.0, help='Seconds between RSS samples')
+    parser.add_argument('--rss-csv', help='Write the RSS timeline to this CSV')
+    parser.add_argument('--spawn', action='store_true', help='Start the NIGGRID stand-in and gunicorn here')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (with --spawn)')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker (with --spawn)')
+    parser.add_argument('--gunicorn-args', default='', help='Extra gunicorn arguments (with --spawn)')
+    parser.add_argument('--standin-latency-ms', type=float, default=0, help='Delay per stand-in response (with --spawn)')
+    args = parser.parse_args()
+
+    payloads = build_payloads(args)
+    process = standin = None
+    base_url = args.url.rstrip('/')
+    with tempfile.TemporaryDirectory(prefix='loadtest_') as scratch:
+        if args.spawn:
+            base_url, process, standin = spawn_server(args, scratch)
+            args.server_pid = process.pid
+
+        sampler = None
+        if args.server_pid:
+            if os.path.isdir('/proc'):
+                sampler = RssSampler(args.server_pid, args.rss_interval)
+                sampler.start()
+            else:
+                print("RSS sampling needs /proc (Linux); skipped.")
+
+        results = {'steps': [], 'scenarios': []}
+        counter, lock = [0], threading.Lock()
+        print(f"Running {args.scenario} against {base_url} with {args.concurrency} users for up to {args.duration:.0f}s...")
+        start = time.perf_counter()
+        deadline = start + args.duration
+        users = [
+            threading.Thread(target=virtual_user, args=(i, base_url, payloads, args, deadline, counter, lock, results))
+            for i in range(args.concurrency)
+        ]
+        try:
+            for user in users:
+                user.start()
+            for user in users:
+                user.join()
+        finally:
+            elapsed = time.perf_counter() - start
+            if sampler:
+                sampler.stop()
+            if process:
+                process.terminate()
+                process.wait()
+            if standin:
+                standin.shutdown()
+
+    print_report(results, elapsed, sampler, args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Local stand-in for the NIGGRID generation page, for load tests and offline runs.
+
+Mimics the ASP.NET form the HTTP backend drives: a GET returns the hidden
+fields, a POST with a reading date returns them again plus an hourly
+generation table for that day. Data is deterministic per date.
+
+Usage:
+    python benchmarks/niggrid_standin.py [--port 8765] [--latency-ms 0]
+
+Then point the app at it:
+    NIGGRID_URL=http://127.0.0.1:8765/ NIGGRID_BACKEND=http NIGGRID_POLITE_DELAY=0,0 gunicorn app:app
+"""
+import argparse
+import itertools
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+STATIONS = [
+    "AFAM VI (GAS/STEAM)", "AZURA-EDO IPP (GAS)", "DELTA (GAS)", "EGBIN (STEAM)",
+    "GEREGU NIPP (GAS)", "IBOM POWER (GAS)", "JEBBA (HYDRO)", "KAINJI (HYDRO)",
+    "OKPAI (GAS/STEAM)", "OMOTOSHO NIPP (GAS)", "SHIRORO (HYDRO)", "ZUNGERU (HYDRO)",
+]
+DATE_FIELD = 'ctl00$MainContent$txtReadingDate'
+
+_viewstate = itertools.count()
+
+def render_page(date_str=None):
+    """Form with fresh hidden fields, plus the day's table when a date was posted."""
+    table = ''
+    if date_str:
+        rng = random.Random(date_str)
+        header = '<tr><th>S/N</th><th>GENCO</th>' + ''.join(f'<th>{h:02d}:00</th>' for h in range(1, 25)) + '</tr>'
+        body = ''.join(
+            f'<tr><td>{i}</td><td>{name}</td>' + ''.join(f'<td>{rng.uniform(0, 450):.2f}</td>' for _ in range(24)) + '</tr>'
+            for i, name in enumerate(STATIONS, 1)
+        )
+        table = f'<table id="MainContent_gvGeneration">{header}{body}</table>'
+    return (
+        '<html><body><form method="post">'
+        f'<input type="hidden" name="__VIEWSTATE" value="vs{next(_viewstate)}"/>'
+        '<input type="hidden" name="__EVENTVALIDATION" value="ev"/>'
+        f'<input type="text" name="{DATE_FIELD}" value="{date_str or ""}"/>'
+        f'</form>{table}</body></html>'
+    ).encode()
+
+class StandInHandler(BaseHTTPRequestHandler):
+    latency = 0.0 # Seconds added to every response
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body):
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send(render_page())
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        self._send(render_page(form.get(DATE_FIELD, [None])[0]))
+
+def start_standin(port=8765, latency_ms=0):
+    """Serves in a daemon thread; returns the server (call shutdown() to stop)."""
+    StandInHandler.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', port), StandInHandler)
+    threading.Thread(target=server.serve_forever, name='niggrid-standin', daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to each response')
+    args = parser.parse_args()
+
+    server = start_standin(args.port, args.latency_ms)
+    print(f"NIGGRID stand-in on http://127.0.0.1:{args.port}/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Startup benchmark: how long a worker takes to import the app and how much
+memory it holds afterwards.
+
+Each measurement runs in a fresh interpreter so module caches don't leak
+between runs. Three modes are compared:
+
+  eager   - imports every processor module, like app.py did before lazy loading
+  lazy    - imports app.py only (processors load on first use)
+  preload - imports app.py with PRELOAD_PROCESSORS=1
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import statistics
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER_IMPORTS = [
+    'scrapers.niggrid',
+    'scrapers.niggrid_scraper',
+    'scrapers.flight_processor',
+    'scrapers.cargo_processor',
+    'scrapers.weekly_flight_processor',
+]
+
+# Runs inside the child interpreter. RSS comes from /proc (Linux); ru_maxrss is
+# the fallback elsewhere.
+CHILD_SNIPPET = """
+import importlib, json, os, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+
+rss_kb = None
+try:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss_kb = int(line.split()[1])
+except OSError:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss_kb //= 1024
+
+print(json.dumps({{'seconds': elapsed, 'rss_kb': rss_kb, 'modules': len(sys.modules)}}))
+"""
+
+MODES = {
+    'eager': (EAGER_IMPORTS + ['app'], {}),
+    'lazy': (['app'], {'PRELOAD_PROCESSORS': '0'}),
+    'preload': (['app'], {'PRELOAD_PROCESSORS': '1'}),
+}
+
+def measure(modules, extra_env):
+    env = os.environ.copy()
+    env.update(extra_env)
+    code = CHILD_SNIPPET.format(modules=modules)
+    out = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per mode')
+    args = parser.parse_args()
+
+    results = {}
+    for mode, (modules, extra_env) in MODES.items():
+        samples = [measure(modules, extra_env) for _ in range(args.runs)]
+        results[mode] = {
+            'import_ms': statistics.median(s['seconds'] for s in samples) * 1000,
+            'rss_mb': statistics.median(s['rss_kb'] for s in samples) / 1024,
+            'modules': samples[-1]['modules'],
+        }
+
+    print(f"{'mode':<10}{'import (ms)':>14}{'RSS (MB)':>12}{'modules':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['import_ms']:>14.1f}{r['rss_mb']:>12.1f}{r['modules']:>10}")
+
+    eager, lazy = results['eager'], results['lazy']
+    print(f"\nLazy vs eager: {eager['import_ms'] / max(lazy['import_ms'], 1e-6):.1f}x faster import, "
+          f"{eager['rss_mb'] - lazy['rss_mb']:.1f} MB less RSS per worker")
+
+if __name__ == '__main__':
+    main()
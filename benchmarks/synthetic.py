@@ -0,0 +1,167 @@
+"""
+Synthetic inputs for benchmarks and load tests: daily flight exports (CSV/TSV)
+and cargo manifest PDFs whose ruled tables parse with the real cargo parser.
+Pure standard library, so the load generator doesn't need pandas.
+"""
+import random
+from datetime import date, timedelta
+
+# --- FLIGHT EXPORTS ---
+FLIGHT_COLUMNS = [
+    'flight_id', 'date_takeoff', 'origin_city', 'origin_name', 'origin_country',
+    'destination_city', 'destination_name', 'destination_country', 'service_type',
+]
+
+AIRPORTS = [
+    ('Ikeja', 'Murtala Muhammed International Airport', 'Nigeria'),
+    ('Abuja', 'Nnamdi Azikiwe International Airport', 'Nigeria'),
+    ('Kano', 'Mallam Aminu Kano International Airport', 'Nigeria'),
+    ('Port Harcourt', 'Port Harcourt International Airport', 'Nigeria'),
+    ('Enugu', 'Akanu Ibiam International Airport', 'Nigeria'),
+    ('Owerri', 'Sam Mbakwe International Cargo Airport', 'Nigeria'),
+    ('Accra', 'Kotoka International Airport', 'Ghana'),
+    ('London', 'Heathrow Airport', 'United Kingdom'),
+    ('Dubai', 'Dubai International Airport', 'United Arab Emirates'),
+]
+
+SERVICE_TYPES = ['Passenger', 'Business', 'General Aviation', 'Cargo', 'Other']
+
+def flight_export(day, rows=1000, sep=',', seed=None):
+    """One day's flight export as bytes."""
+    rng = random.Random(seed)
+    lines = [sep.join(FLIGHT_COLUMNS)]
+    for i in range(rows):
+        origin = rng.choice(AIRPORTS)
+        destination = rng.choice(AIRPORTS)
+        takeoff = f"{day.isoformat()} {rng.randrange(24):02d}:{rng.randrange(60):02d}"
+        lines.append(sep.join([
+            f"FL{day:%Y%m%d}{i:06d}", takeoff, *origin, *destination, rng.choice(SERVICE_TYPES)
+        ]))
+    return ('\n'.join(lines) + '\n').encode()
+
+# --- CARGO MANIFEST PDFS ---
+CARGO_COLUMN_WIDTHS = [25, 45, 90, 60, 45, 45, 45, 45, 95, 70] # 10 columns, 565pt
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+ROW_HEIGHT = 16
+FONT_SIZE = 6
+
+CARGO_FIELD_ROW = ['NO', 'POSITION', "SHIP'S NAME", 'CARGO', 'QTY', 'ARRVD', 'ETB', 'SAILED', 'RECEIVERS', 'REMARKS']
+
+DOMESTIC_JETTIES = ['APAPA JETTY LAT 6.44N', 'TINCAN ISLAND PORT', 'ATLAS COVE JETTY', 'ONNE PORT LAT 4.71N', 'WARRI OLD PORT']
+FOREIGN_JETTIES = ['TEMA PORT GHANA', 'LOME PORT TOGO', 'COTONOU BENIN']
+CARGOES = ['PMS', 'AGO', 'DPK', 'LPG', 'PMS/AGO', 'BITUMEN']
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def _page_stream(title, rows):
+    """
+    Content stream for one page: a title line above a ruled table.
+    rows: list of lists (10 cells) or a str for a full-width merged row
+    """
+    left = (PAGE_WIDTH - sum(CARGO_COLUMN_WIDTHS)) / 2
+    right = left + sum(CARGO_COLUMN_WIDTHS)
+    top = PAGE_HEIGHT - 60
+    ops = ['0.5 w']
+
+    if title:
+        ops.append(f"BT /F1 9 Tf {left:.1f} {top + 12:.1f} Td ({_pdf_escape(title)}) Tj ET")
+
+    y = top
+    for row in rows:
+        bottom = y - ROW_HEIGHT
+        # Horizontal rules
+        ops.append(f"{left:.1f} {y:.1f} m {right:.1f} {y:.1f} l S")
+        ops.append(f"{left:.1f} {bottom:.1f} m {right:.1f} {bottom:.1f} l S")
+        # Vertical rules (outer only for merged rows)
+        x = left
+        edges = [left]
+        for width in CARGO_COLUMN_WIDTHS:
+            x += width
+            edges.append(x)
+        if isinstance(row, str):
+            edges = [left, right]
+            cells = [(left, row)]
+        else:
+            cells = list(zip(edges[:-1], row))
+        for ex in edges:
+            ops.append(f"{ex:.1f} {y:.1f} m {ex:.1f} {bottom:.1f} l S")
+        for cx, text in cells:
+            if text:
+                ops.append(f"BT /F1 {FONT_SIZE} Tf {cx + 2:.1f} {bottom + 5:.1f} Td ({_pdf_escape(text)}) Tj ET")
+        y = bottom
+    return '\n'.join(ops).encode('latin-1')
+
+def _build_pdf(page_streams):
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None, # Pages, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for stream in page_streams:
+        content_id = len(objects) + 1
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(len(objects) + 1)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+        )
+    kids = ' '.join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at)
+    return bytes(out)
+
+def _entry_row(rng, number, manifest_date, vacant=False):
+    if vacant:
+        return ['', 'VACANT', '-', '', '', '', '', '', '', ''] # No position: dropped by the parser
+    eta = manifest_date - timedelta(days=rng.randrange(1, 6))
+    cargo = rng.choice(CARGOES)
+    qty = '/'.join(str(rng.randrange(5, 60) * 1000) for _ in cargo.split('/'))
+    return [
+        str(number), f"B{rng.randrange(1, 20)}", f"MT {rng.choice(['ALPHA', 'BRAVO', 'OCEAN', 'STAR', 'GLORY'])} {rng.randrange(1, 99)}",
+        cargo, qty, f"{eta:%d-%b-%y}".upper(), f"{manifest_date:%d-%b-%y}".upper(), '-',
+        rng.choice(['NNPC', 'DANGOTE', 'MRS', 'OANDO']), 'DISCHARGING'
+    ]
+
+def cargo_manifest_pdf(pages=3, rows_per_page=30, foreign_share=0.3, vacant_share=0.1, manifest_date=None, seed=None):
+    """
+    Multi-page manifest. Each page after the first starts with its jetty name
+    as a text line above a table whose first row is the field header. A share
+    of pages are foreign berths or vacant positions, which the parser discards.
+    """
+    rng = random.Random(seed)
+    manifest_date = manifest_date or date(2025, 1, 15)
+    streams = []
+    number = 1
+    for page_index in range(pages):
+        foreign = page_index > 0 and rng.random() < foreign_share
+        jetty = rng.choice(FOREIGN_JETTIES if foreign else DOMESTIC_JETTIES)
+        rows = []
+        title = None
+        if page_index == 0:
+            rows.append('DAILY SHIPPING POSITION')
+            rows.append('NIGERIAN PORTS AUTHORITY')
+            rows.append([''] * 9 + [f"DATE: {manifest_date:%d-%b-%y}".upper()]) # Read from row 2, column 9
+            rows.append(CARGO_FIELD_ROW)
+            rows.append(jetty)
+        else:
+            title = jetty
+            rows.append(CARGO_FIELD_ROW)
+        for _ in range(rows_per_page):
+            rows.append(_entry_row(rng, number, manifest_date, vacant=rng.random() < vacant_share))
+            number += 1
+        if page_index == pages - 1:
+            rows.append('END OF REPORT') # Last row of the last page is dropped by the parser
+        streams.append(_page_stream(title, rows))
+    return _build_pdf(streams)
@@ -0,0 +1,8 @@
+# Default gunicorn settings, read by `gunicorn app:app` when started from this folder.
+# Threaded workers, because each live progress stream (/progress/<job_id>)
+# holds a connection for the length of its job; with plain sync workers one
+# open stream would take a whole worker.
+import os
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
@@ -0,0 +1,125 @@
+"""
+On-demand request profiling for the tool routes.
+
+Disabled unless PROFILING_TOKEN is set. When it is, a request carrying
+`?profile=<token>` (e.g. open /flight_data?profile=... and submit the form
+from there) runs under cProfile plus a stack sampler. The reports are saved
+in <downloads>/profiles/<route>_<timestamp>/:
+
+  profile.pstats     raw cProfile data (snakeviz, pstats, ...)
+  top_functions.txt  slowest functions by cumulative and own time
+  call_tree.txt      sampled call tree with inclusive sample counts
+  flamegraph.folded  collapsed stacks for flamegraph.pl / speedscope
+"""
+import cProfile
+import functools
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import request, flash
+
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 5))
+TOP_FUNCTIONS = 40
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval from a helper thread."""
+    def __init__(self, thread_id, interval_ms=PROFILE_SAMPLE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+def write_call_tree(stacks, out):
+    """Indented tree of sampled stacks, children sorted by inclusive samples."""
+    tree = {}
+    for stack, count in stacks.items():
+        node = tree
+        for frame in stack.split(';'):
+            entry = node.setdefault(frame, [0, {}])
+            entry[0] += count
+            node = entry[1]
+
+    total = sum(stacks.values()) or 1
+    def walk(node, depth):
+        for frame, (count, children) in sorted(node.items(), key=lambda x: -x[1][0]):
+            out.write(f"{'  ' * depth}{count / total:6.1%}  {count:>6}  {frame}\n")
+            walk(children, depth + 1)
+    walk(tree, 0)
+
+def save_profile(folder, label, profiler, sampler, elapsed):
+    os.makedirs(folder, exist_ok=True)
+    profiler.dump_stats(os.path.join(folder, 'profile.pstats'))
+
+    with open(os.path.join(folder, 'top_functions.txt'), 'w') as f:
+        f.write(f"{label}: {elapsed:.3f}s wall, {sum(sampler.stacks.values())} samples\n\n")
+        stats = pstats.Stats(profiler, stream=f).strip_dirs()
+        f.write("=== By cumulative time ===\n")
+        stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        f.write("=== By own time ===\n")
+        stats.sort_stats('tottime').print_stats(TOP_FUNCTIONS)
+
+    with open(os.path.join(folder, 'call_tree.txt'), 'w') as f:
+        write_call_tree(sampler.stacks, f)
+
+    with open(os.path.join(folder, 'flamegraph.folded'), 'w') as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+def profiled(label, output_folder):
+    """
+    Route decorator. With profiling disabled (no PROFILING_TOKEN) the view is
+    returned unwrapped, so there is no per-request cost at all.
+    """
+    def decorator(view):
+        if not PROFILING_TOKEN:
+            return view
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            token = request.args.get('profile', '')
+            if not token or not hmac.compare_digest(token, PROFILING_TOKEN):
+                return view(*args, **kwargs)
+
+            profiler = cProfile.Profile()
+            sampler = StackSampler(threading.get_ident())
+            start = time.perf_counter()
+            sampler.start()
+            profiler.enable()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                profiler.disable()
+                sampler.stop()
+                elapsed = time.perf_counter() - start
+                folder = os.path.join(output_folder, 'profiles', f"{label}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}")
+                save_profile(folder, f"{request.method} {request.path}", profiler, sampler, elapsed)
+                print(f"Profile saved to {folder}")
+                flash(f"Profile saved to {folder}", "success")
+        return wrapper
+    return decorator
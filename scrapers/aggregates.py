@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import pandas as pd
+
+# --- AGGREGATE STORE ---
+# Every processor keeps the table behind its report (flight groupby, weekly
+# summary, cargo master) here, so the JSON API can serve it without parsing
+# the Excel/ZIP output again. One pickle per report: <kind>/<name>.pkl
+AGGREGATES_FOLDER = os.environ.get('AGGREGATES_FOLDER', os.path.join(os.getcwd(), 'data', 'aggregates'))
+
+AGGREGATE_KINDS = ['flight', 'weekly', 'cargo']
+
+def aggregate_path(kind, name, folder=AGGREGATES_FOLDER):
+    return os.path.join(folder, kind, f"{name}.pkl")
+
+def save_aggregate(kind, name, df, folder=AGGREGATES_FOLDER):
+    os.makedirs(os.path.join(folder, kind), exist_ok=True)
+    path = aggregate_path(kind, name, folder)
+    tmp_path = path + '.tmp'
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+def list_aggregates(kind, folder=AGGREGATES_FOLDER):
+    """Report names for a kind, newest first."""
+    kind_folder = os.path.join(folder, kind)
+    if not os.path.isdir(kind_folder):
+        return []
+    paths = [os.path.join(kind_folder, f) for f in os.listdir(kind_folder) if f.endswith('.pkl')]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    return [os.path.basename(p)[:-len('.pkl')] for p in paths]
+
+def resolve_aggregate(kind, name=None, folder=AGGREGATES_FOLDER):
+    """Path of the named report (or the latest one), or None if there isn't one."""
+    if name is None:
+        names = list_aggregates(kind, folder)
+        if not names:
+            return None
+        name = names[0]
+    path = aggregate_path(kind, name, folder)
+    # Names come from the query string; keep them inside the kind folder
+    if os.path.dirname(os.path.abspath(path)) != os.path.abspath(os.path.join(folder, kind)):
+        return None
+    return path if os.path.exists(path) else None
+
+def load_aggregate(path):
+    return pd.read_pickle(path)
+
+# --- ETAGS ---
+# Digests are cached by (path, mtime, size), so a conditional poll only costs
+# a stat() per input file.
+_digest_cache = {}
+
+def file_digest(path):
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _digest_cache.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _digest_cache[key] = digest
+    return digest
+
+def make_etag(input_paths, params):
+    """Strong ETag from the content of every input file plus the query parameters."""
+    h = hashlib.sha256()
+    for path in input_paths:
+        h.update(os.path.basename(path).encode())
+        h.update(file_digest(path).encode())
+    h.update(json.dumps(params, sort_keys=True).encode())
+    return h.hexdigest()[:32]
+
+# --- PAGINATION ---
+def paginate(df, page, per_page, columns=None):
+    """
+    Slices one page of a table and returns a JSON-ready dict.
+    columns: list of column names to keep (unknown names raise KeyError)
+    """
+    if columns:
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise KeyError(f"Unknown column(s): {', '.join(missing)}")
+        df = df[columns]
+    total = len(df)
+    start = (page - 1) * per_page
+    page_df = df.iloc[start:start + per_page]
+    return {
+        'columns': [str(c) for c in df.columns],
+        'total_rows': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page,
+        'rows': json.loads(page_df.to_json(orient='records', date_format='iso')),
+    }
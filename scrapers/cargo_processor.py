@@ -1,11 +1,18 @@
 import pdfplumber
 import pandas as pd
 import os
+import re
 import zipfile
+import tempfile
 from datetime import datetime
 from openpyxl import load_workbook
 from openpyxl.styles import Font, Alignment, PatternFill
 import warnings
+from scrapers.uploads import upload_name, upload_stream
+from scrapers.aggregates import save_aggregate
+from scrapers.exporters import export_format, export_filename, write_table
+from scrapers.progress import console_progress
+from scrapers.cargo_store import CARGO_STORE_FOLDER, manifest_digest, load_manifest, save_manifest, load_master
 
 warnings.filterwarnings('ignore')
 
@@ -26,6 +33,10 @@ JETTY_STATE_MAPPING = {
 
 FOREIGN_KEYWORDS = ['GHANA', 'ABIDJAN', 'LOME', 'TOGO', 'COTONOU', 'BENIN', 'IVORY COAST']
 
+# Skip table extraction on pages whose rows would all be discarded (foreign
+# berths, vacant positions), judged from the page text. See discarded_page.
+SKIP_DISCARDED_PAGES = os.environ.get('CARGO_SKIP_DISCARDED_PAGES', '1') == '1'
+
 # --- HELPERS ---
 def clean_jetty_name(text):
     if not text: return ""
@@ -91,7 +102,81 @@ def is_entry_row(row):
     non_none = [c for c in row if c and str(c).strip()]
     return (len(non_none) > 0 and not is_jetty_row(row) and not is_field_row(row))
 
+# --- PAGE PRE-PASS ---
+# Text-line versions of the row checks above. The text doesn't show cell
+# borders, so any line the table might read as a single-cell jetty row counts
+# as a possible heading. Only lines that are clearly a multi-cell entry (a
+# number / position in front plus at least two date or '-' cells), a field
+# row or a vacant row are taken as anything else.
+DATE_TOKEN = re.compile(r'\b\d{1,2}[-./ ](?:[A-Z]{3,4}|\d{1,2})[-./]\d{2,4}\b|\b\d{4}-\d{2}-\d{2}\b', re.IGNORECASE)
+POSITION_PREFIX = re.compile(r'^(\d+|[A-Z]{1,3}\d+[A-Z]?)\s', re.IGNORECASE) # '12 B4 ...', 'B4 MT ...'
+PAGE_NUMBER_LINE = re.compile(r'^page\s*\d+(\s*(of|/)\s*\d+)?$', re.IGNORECASE)
+
+def is_field_line(line):
+    upper = line.upper()
+    return sum(1 for exp in ['POSITION', 'CARGO', 'QTY', 'ARRVD', 'ETB', 'SAILED'] if exp in upper) >= 3
+
+def is_entry_line(line):
+    """A table entry with several cells, never a jetty heading."""
+    if not POSITION_PREFIX.match(line) or get_state_from_jetty(line):
+        return False # '2 NNPC JETTY', or anything naming a Nigerian jetty, may be a heading
+    marks = len(DATE_TOKEN.findall(line)) + line.split().count('-')
+    return marks >= 2
+
+def is_vacant_line(line):
+    """Row the parser drops under any jetty (its position comes out as VACANT or '-')."""
+    tokens = line.upper().split()
+    return len(tokens) >= 2 and all(t in ('VACANT', '-') for t in tokens)
+
+def is_foreign_heading(line):
+    name = clean_jetty_name(line)
+    return is_foreign_entry(name) and not get_state_from_jetty(name)
+
+def discarded_page(page_text, current_jetty):
+    """
+    Cheap check from the page text alone: True when every row on the page is
+    dropped anyway (entries under a foreign jetty, vacant positions), so
+    table extraction can be skipped. Returns (discarded, jetty after the
+    page). Conservative: the page is kept unless every line is a foreign
+    heading, a field row, a vacant row, or an entry under a foreign jetty.
+    """
+    lines = [line.strip() for line in (page_text or '').split('\n') if line.strip()]
+    if not lines:
+        return False, current_jetty
+    foreign = is_foreign_entry(current_jetty)
+    jetty = current_jetty
+    # parse_pdf may take the first text line as the jetty; repeating the current one is harmless
+    first = next((line for line in lines if 'page' not in line.lower()), None)
+
+    for line in lines:
+        if 'page' in line.lower():
+            if PAGE_NUMBER_LINE.match(line): continue
+            return False, current_jetty
+        if is_field_line(line) or is_vacant_line(line): continue
+        if is_entry_line(line):
+            if not foreign: return False, current_jetty # Might be kept
+            continue
+        # Anything else might be a jetty row, the only kind that switches the jetty
+        if is_foreign_heading(line):
+            foreign, jetty = True, clean_jetty_name(line)
+        elif not (line is first and clean_jetty_name(line) == current_jetty):
+            return False, current_jetty
+    return True, jetty
+
 def parse_pdf_to_excel(filepath, output_filepath):
+    """filepath: path or seekable binary file object of the manifest PDF"""
+    df = parse_pdf(filepath)
+    if df is not None:
+        df.to_excel(output_filepath, index=False, engine='openpyxl')
+        format_excel_file(output_filepath)
+    return df
+
+def parse_pdf(filepath, progress=None):
+    """
+    Manifest rows as a DataFrame with the fixed headers, or None if nothing usable.
+    progress: optional callback, gets a 'page' event per page parsed
+    """
+    progress = progress or console_progress
     all_data = []
     date = None
     current_jetty = None
@@ -100,18 +185,29 @@ def parse_pdf_to_excel(filepath, output_filepath):
     with pdfplumber.open(filepath) as pdf:
         pages = pdf.pages
         for page_index, page in enumerate(pages):
+            # 0. Pages that are all foreign / vacant skip table extraction (never page 1, it has the date)
+            page_text = None
+            if page_index > 0 and SKIP_DISCARDED_PAGES:
+                page_text = page.extract_text()
+                discarded, jetty_after = discarded_page(page_text, current_jetty)
+                if discarded:
+                    current_jetty = jetty_after # Still foreign for the rows of the next page
+                    progress('page', f"Page {page_index + 1}/{len(pages)} (skipped)", current=page_index + 1, total=len(pages), skipped=True)
+                    continue
+
+            tables = page.extract_tables() # Once per page; it is the costly part
+
             # 1. Date (Page 1)
             if page_index == 0:
-                 tables = page.extract_tables()
                  if tables and len(tables[0]) > 2:
                      row = tables[0][2]
                      if len(row) > 9 and row[9]: date = parse_date(str(row[9]))
 
             # 2. Jetty Info (Top of Page)
             if page_index > 0:
-                tables = page.extract_tables()
                 if tables and tables[0] and is_field_row(tables[0][0]):
-                    page_text = page.extract_text()
+                    if page_text is None:
+                        page_text = page.extract_text()
                     if page_text:
                         for line in page_text.split('\n'):
                             if line.strip() and 'page' not in line.lower():
@@ -119,7 +215,6 @@ def parse_pdf_to_excel(filepath, output_filepath):
                                 break
 
             # 3. Rows
-            tables = page.extract_tables()
             if tables:
                 table = tables[0]
                 rows_to_process = table[:-1] if page_index == len(pages) - 1 else table
@@ -163,12 +258,11 @@ def parse_pdf_to_excel(filepath, output_filepath):
                         }
                         all_data.extend(split_bundled_row(base))
 
+            progress('page', f"Page {page_index + 1}/{len(pages)}", current=page_index + 1, total=len(pages))
+
     if all_data:
         df = pd.DataFrame(all_data)
-        df = df.reindex(columns=fixed_headers, fill_value='')
-        df.to_excel(output_filepath, index=False, engine='openpyxl')
-        format_excel_file(output_filepath)
-        return df
+        return df.reindex(columns=fixed_headers, fill_value='')
     return None
 
 def format_excel_file(filepath):
@@ -201,50 +295,72 @@ def format_excel_file(filepath):
     wb.save(filepath)
 
 # --- MAIN EXPORT FUNCTION ---
-def process_cargo_files(uploaded_files, download_folder):
+def write_cleaned_file(df, filename, download_folder, fmt='xlsx'):
+    """CLEANED_<name>.<ext> inside download_folder for already-parsed rows. Returns the path."""
+    fmt = export_format(fmt)
+    out_name = export_filename("CLEANED_" + filename.replace('.pdf', ''), fmt)
+    out_path = os.path.join(download_folder, out_name)
+    if fmt == 'xlsx':
+        df.to_excel(out_path, index=False, engine='openpyxl')
+        format_excel_file(out_path)
+    else:
+        write_table(df, out_path, fmt)
+    return out_path
+
+def clean_cargo_file(source, filename, download_folder, fmt='xlsx', progress=None):
     """
-    uploaded_files: List of FileStorage objects from Flask
+    Parses one manifest into CLEANED_<name>.<ext> inside download_folder.
+    source: path or seekable binary file object of the PDF
+    fmt: 'xlsx', 'parquet' or 'csv.gz'
+    progress: optional callback, passed on to parse_pdf
+    Returns (output_path, df), or (None, None) when the PDF has no usable rows.
     """
-    temp_dir = os.path.join(download_folder, "temp_pdfs")
-    if not os.path.exists(temp_dir): os.makedirs(temp_dir)
-    
-    processed_paths = []
-    master_dfs = []
-    
-    # 1. Process Each File
-    for file in uploaded_files:
-        if not file.filename.lower().endswith('.pdf'): continue
-        
-        # Save PDF temporarily
-        pdf_path = os.path.join(temp_dir, file.filename)
-        file.save(pdf_path)
-        
-        # Output Path
-        xlsx_name = "CLEANED_" + file.filename.replace('.pdf', '.xlsx')
-        xlsx_path = os.path.join(download_folder, xlsx_name)
-        
-        # Run Parser
-        try:
-            df = parse_pdf_to_excel(pdf_path, xlsx_path)
-            if df is not None:
-                processed_paths.append(xlsx_path)
-                master_dfs.append(df)
-        except Exception as e:
-            print(f"Error parsing {file.filename}: {e}")
-        
-        # Cleanup PDF
-        os.remove(pdf_path)
-        
-    if not master_dfs:
-        return None
+    df = parse_pdf(source, progress)
+    if df is None:
+        return None, None
+    return write_cleaned_file(df, filename, download_folder, fmt), df
+
+def clean_cargo_file_stored(source, filename, download_folder, fmt='xlsx', store_folder=CARGO_STORE_FOLDER, stats=None, progress=None):
+    """
+    clean_cargo_file backed by the cargo master store: a PDF stored before (same
+    content) is not parsed again, a new one is parsed and upserted into the master.
+    stats: optional dict, counts parsed / reused manifests and rows_added / rows_updated
+    """
+    if stats is None:
+        stats = {}
+    digest = manifest_digest(source)
+    df = load_manifest(digest, store_folder)
+    if df is not None:
+        stats['reused'] = stats.get('reused', 0) + 1
+        return write_cleaned_file(df, filename, download_folder, fmt), df
+
+    df = parse_pdf(source, progress)
+    if df is None:
+        return None, None
+    added, updated = save_manifest(digest, df, filename, store_folder)
+    stats['parsed'] = stats.get('parsed', 0) + 1
+    stats['rows_added'] = stats.get('rows_added', 0) + added
+    stats['rows_updated'] = stats.get('rows_updated', 0) + updated
+    return write_cleaned_file(df, filename, download_folder, fmt), df
 
+def bundle_cargo_results(processed_paths, master_dfs, download_folder, cleanup=True, fmt='xlsx'):
+    """
+    Writes the master file and zips it with the individual cleaned files.
+    cleanup: remove the individual and master files once they are zipped
+    fmt: format of the master file ('xlsx', 'parquet' or 'csv.gz')
+    """
     # 2. Create Master File
-    master_filename = "MASTER_MERGED_CARGO_DATA.xlsx"
+    fmt = export_format(fmt)
+    master_filename = export_filename("MASTER_MERGED_CARGO_DATA", fmt)
     master_path = os.path.join(download_folder, master_filename)
     
     master_df = pd.concat(master_dfs, ignore_index=True)
-    master_df.to_excel(master_path, index=False, engine='openpyxl')
-    format_excel_file(master_path)
+    if fmt == 'xlsx':
+        master_df.to_excel(master_path, index=False, engine='openpyxl')
+        format_excel_file(master_path)
+    else:
+        write_table(master_df, master_path, fmt)
+    save_aggregate('cargo', "MASTER_MERGED_CARGO_DATA", master_df)
     
     # 3. Zip Everything (Master + Individual Cleaned Files)
     zip_filename = "Cargo_Analysis_Results.zip"
@@ -254,7 +370,73 @@ def process_cargo_files(uploaded_files, download_folder):
         zipf.write(master_path, master_filename)
         for p in processed_paths:
             zipf.write(p, os.path.basename(p))
-            os.remove(p) # Remove individual excel files after zipping to save space
+            if cleanup: os.remove(p) # Remove individual excel files after zipping to save space
     
-    os.remove(master_path) # Remove master excel after zipping
-    return zip_filename
\ No newline at end of file
+    if cleanup: os.remove(master_path) # Remove master excel after zipping
+    return zip_filename
+
+def export_cargo_master(download_folder, fmt='xlsx', store_folder=CARGO_STORE_FOLDER):
+    """
+    Writes the stored master to a temp file in download_folder (no PDF is parsed).
+    Returns (path, download_name), or (None, None) while the store is empty.
+    """
+    master_df = load_master(store_folder)
+    if master_df is None or master_df.empty:
+        return None, None
+    fmt = export_format(fmt)
+    download_name = export_filename(f"CARGO_MASTER_{datetime.now().strftime('%Y%m%d')}", fmt)
+    fd, path = tempfile.mkstemp(prefix='.cargo_master_', suffix=export_filename('', fmt), dir=download_folder)
+    os.close(fd)
+    if fmt == 'xlsx':
+        master_df.to_excel(path, index=False, engine='openpyxl')
+        format_excel_file(path)
+    else:
+        write_table(master_df, path, fmt)
+    return path, download_name
+
+def process_cargo_files(uploaded_files, download_folder, fmt='xlsx', store_folder=CARGO_STORE_FOLDER, stats=None, progress=None):
+    """
+    uploaded_files: List of FileStorage objects from Flask (or binary file objects)
+    fmt: 'xlsx', 'parquet' or 'csv.gz' for the cleaned and master files in the ZIP
+    store_folder: cargo master store (None parses every file and stores nothing)
+    stats: optional dict, see clean_cargo_file_stored
+    progress: optional callback, gets 'page' events while a PDF is parsed and a
+              'file' event per file finished (status parsed / reused / empty / failed)
+    """
+    progress = progress or console_progress
+    if stats is None:
+        stats = {}
+    processed_paths = []
+    master_dfs = []
+    pdf_files = [file for file in uploaded_files if upload_name(file).lower().endswith('.pdf')]
+    progress('start', f"Processing {len(pdf_files)} PDF(s)", total=len(pdf_files))
+    
+    # 1. Process Each File
+    for i, file in enumerate(pdf_files, 1):
+        filename = upload_name(file)
+        file_progress = lambda event, message, **data: progress(event, f"{filename}: {message}", file=filename, **data)
+        
+        # Run Parser (pdfplumber reads the spooled upload directly, no temp copy)
+        try:
+            if store_folder:
+                reused = stats.get('reused', 0)
+                out_path, df = clean_cargo_file_stored(upload_stream(file), filename, download_folder, fmt, store_folder, stats, file_progress)
+                status = 'reused' if stats.get('reused', 0) > reused else 'parsed'
+            else:
+                out_path, df = clean_cargo_file(upload_stream(file), filename, download_folder, fmt, file_progress)
+                status = 'parsed'
+            if df is not None:
+                processed_paths.append(out_path)
+                master_dfs.append(df)
+            else:
+                status = 'empty'
+        except Exception as e:
+            progress('error', f"Error parsing {filename}: {e}", file=filename)
+            status = 'failed'
+        progress('file', f"{filename}: {status}", file=filename, status=status, current=i, total=len(pdf_files))
+        
+    if not master_dfs:
+        return None
+
+    progress('report', "Writing master file")
+    return bundle_cargo_results(processed_paths, master_dfs, download_folder, fmt=fmt)
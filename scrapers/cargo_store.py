@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError: # Windows: no cross-process lock, fine for the dev server
+    fcntl = None
+
+# --- CARGO MASTER STORE ---
+# A running master of every manifest ever uploaded, so a new batch only parses
+# its new PDFs. Layout inside CARGO_STORE_FOLDER:
+#   master.pkl            upserted master rows
+#   manifests/<sha>.pkl   parsed rows of each manifest, by PDF content hash
+#   manifests.json        index: content hash -> filename, rows, date, added
+CARGO_STORE_FOLDER = os.environ.get('CARGO_STORE_FOLDER', os.path.join(os.getcwd(), 'data', 'cargo'))
+
+# One master row per manifest date, berth and ship. Cargo is part of the key
+# because bundled entries (PMS/AGO) are split into one row per cargo.
+CARGO_MASTER_KEY = ['Date', 'Jetty Information', 'Position', "Ship's Name", 'Cargo']
+
+def master_path(store_folder=CARGO_STORE_FOLDER):
+    return os.path.join(store_folder, 'master.pkl')
+
+def manifest_path(digest, store_folder=CARGO_STORE_FOLDER):
+    return os.path.join(store_folder, 'manifests', f"{digest}.pkl")
+
+def index_path(store_folder=CARGO_STORE_FOLDER):
+    return os.path.join(store_folder, 'manifests.json')
+
+@contextmanager
+def store_lock(store_folder=CARGO_STORE_FOLDER):
+    """Serializes read-modify-write of the master and index across workers."""
+    os.makedirs(store_folder, exist_ok=True)
+    with open(os.path.join(store_folder, '.lock'), 'w') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+def _write_pickle(df, path):
+    """Atomic, so readers never see a half-written file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+def manifest_digest(source):
+    """sha256 of a PDF (path or seekable binary stream, left where it was)."""
+    h = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+        return h.hexdigest()
+    pos = source.tell()
+    for chunk in iter(lambda: source.read(1024 * 1024), b''):
+        h.update(chunk)
+    source.seek(pos)
+    return h.hexdigest()
+
+# --- MANIFESTS ---
+def load_index(store_folder=CARGO_STORE_FOLDER):
+    path = index_path(store_folder)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def load_manifest(digest, store_folder=CARGO_STORE_FOLDER):
+    """Parsed rows of a manifest seen before, or None if it is new."""
+    path = manifest_path(digest, store_folder)
+    if not os.path.exists(path):
+        return None
+    return pd.read_pickle(path)
+
+def save_manifest(digest, df, filename, store_folder=CARGO_STORE_FOLDER):
+    """Keeps a parsed manifest and upserts its rows into the master."""
+    with store_lock(store_folder):
+        _write_pickle(df, manifest_path(digest, store_folder))
+        dates = pd.to_datetime(df['Date'], errors='coerce').dropna()
+        index = load_index(store_folder)
+        index[digest] = {
+            'filename': filename,
+            'rows': len(df),
+            'date': dates.min().date().isoformat() if not dates.empty else None,
+            'added': datetime.now().isoformat(timespec='seconds'),
+        }
+        tmp_path = index_path(store_folder) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, index_path(store_folder))
+        return _upsert_master(df, store_folder)
+
+# --- MASTER ---
+def load_master(store_folder=CARGO_STORE_FOLDER):
+    path = master_path(store_folder)
+    if not os.path.exists(path):
+        return None
+    return pd.read_pickle(path)
+
+def master_keys(df):
+    """Key columns as stripped upper-case text, so ' mt star ' matches 'MT STAR'."""
+    return pd.DataFrame({col: df[col].astype(str).str.strip().str.upper() for col in CARGO_MASTER_KEY})
+
+def _upsert_master(df, store_folder):
+    """
+    Master rows whose key appears in df are replaced by df, which is appended
+    as-is (rows repeating a key inside one manifest, e.g. split cargo lines,
+    all stay). Returns (added, updated): rows of df that are new / replace a
+    stored key. Caller holds the lock.
+    """
+    master = load_master(store_folder)
+    if master is None or master.empty:
+        combined = df
+        updated = 0
+    else:
+        master_index = pd.MultiIndex.from_frame(master_keys(master))
+        new_index = pd.MultiIndex.from_frame(master_keys(df))
+        updated = int(new_index.isin(master_index).sum())
+        combined = pd.concat([master[~master_index.isin(new_index)], df], ignore_index=True)
+    added = len(df) - updated
+
+    combined = combined.sort_values('Date', kind='stable', key=lambda s: pd.to_datetime(s, errors='coerce')).reset_index(drop=True)
+    _write_pickle(combined, master_path(store_folder))
+    return added, updated
@@ -0,0 +1,76 @@
+import os
+import zipfile
+import pandas as pd
+
+# --- COLUMNAR EXPORTS ---
+# Alternatives to the formatted Excel workbooks for large outputs: Parquet
+# (needs pyarrow) and gzip CSV, written straight from the DataFrames. Outputs
+# with several tables (e.g. NIGGRID totals + raw data) become one ZIP with a
+# file per table.
+
+EXPORT_FORMATS = {'xlsx': '.xlsx', 'parquet': '.parquet', 'csv.gz': '.csv.gz'}
+DEFAULT_EXPORT_FORMAT = 'xlsx'
+PARQUET_COMPRESSION = os.environ.get('PARQUET_COMPRESSION', 'zstd')
+CSV_GZIP_LEVEL = int(os.environ.get('CSV_GZIP_LEVEL', 6)) # 9 is much slower for a few % smaller files
+DICTIONARY_MAX_RATIO = 0.5 # Text columns with fewer distinct values than this share of rows are dictionary-encoded
+
+def export_format(value):
+    """Validated format from a form field or CLI flag; anything unknown means xlsx."""
+    value = str(value or DEFAULT_EXPORT_FORMAT).strip().lower()
+    return value if value in EXPORT_FORMATS else DEFAULT_EXPORT_FORMAT
+
+def export_filename(stem, fmt):
+    return stem + EXPORT_FORMATS[fmt]
+
+def columnar_frame(df):
+    """
+    Copy ready for Parquet: string column names, mixed-type object columns
+    (e.g. dates next to '-') as text, and repetitive text columns as
+    categoricals, which Parquet stores as dictionary pages.
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object or pd.api.types.is_string_dtype(series):
+            kind = pd.api.types.infer_dtype(series, skipna=True)
+            if kind not in ('string', 'empty'):
+                series = series.where(series.isna(), series.astype(str))
+            if series.nunique(dropna=True) <= DICTIONARY_MAX_RATIO * len(series):
+                series = series.astype('category')
+        columns[str(col)] = series
+    return pd.DataFrame(columns, index=df.index)
+
+def write_table(df, path, fmt):
+    """One table as Parquet or gzip CSV (no index)."""
+    if fmt == 'parquet':
+        columnar_frame(df).to_parquet(path, index=False, compression=PARQUET_COMPRESSION)
+    elif fmt == 'csv.gz':
+        df.to_csv(path, index=False, compression={'method': 'gzip', 'compresslevel': CSV_GZIP_LEVEL})
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return path
+
+def export_tables(tables, download_folder, stem, fmt):
+    """
+    tables: dict of name -> DataFrame, in output order
+    A single table is written as <stem>.<ext>; several go into <stem>.zip as
+    <name>.<ext> each. Returns the filename.
+    """
+    if len(tables) == 1:
+        filename = export_filename(stem, fmt)
+        write_table(next(iter(tables.values())), os.path.join(download_folder, filename), fmt)
+        return filename
+
+    filename = f"{stem}.zip"
+    zip_path = os.path.join(download_folder, filename)
+    with zipfile.ZipFile(zip_path, 'w') as zipf: # Members are already compressed, so stored as-is
+        for name, df in tables.items():
+            member = export_filename(str(name).replace(' ', '_'), fmt)
+            part_path = os.path.join(download_folder, f".{stem}_{member}")
+            try:
+                write_table(df, part_path, fmt)
+                zipf.write(part_path, member)
+            finally:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+    return filename
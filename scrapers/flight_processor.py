@@ -1,8 +1,16 @@
 import pandas as pd
+import numpy as np
 import io
 import re
 import os
+import calendar
 import datetime
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from scrapers.uploads import upload_name, read_delimited_upload, save_upload
+from scrapers.aggregates import save_aggregate
+from scrapers.exporters import export_format, export_tables
 
 # --- CONFIGURATION ---
 CITY_TO_STATE_DB = {
@@ -15,6 +23,9 @@ CITY_TO_STATE_DB = {
     'makurdi': 'Benue', 'minna': 'Niger', 'abuja': 'Abuja', 'lekki': 'Lagos'
 }
 
+# Columns that identify one flight record across overlapping daily exports ('' disables the check)
+FLIGHT_DEDUP_KEY = [c.strip().lower() for c in os.environ.get('FLIGHT_DEDUP_KEY', 'flight_id,date_takeoff,origin_name,destination_name').split(',') if c.strip()]
+
 def standardize_airport_name(name):
     n = str(name).strip().lower()
     if 'murtala' in n or 'muritala' in n: return 'Murtala Muhammed International Airport'
@@ -32,52 +43,197 @@ def standardize_airport_name(name):
     elif 'benin' in n: return 'Benin Airport'
     else: return str(name).strip()
 
-def process_flight_files(uploaded_files, target_month, target_year, download_folder):
+def map_category(st):
+    s = str(st).strip().lower()
+    if s in ['general aviation', 'other', 'others', 'non-categorised']: return 'General Aviation'
+    if s == 'passenger': return 'Commercial'
+    if 'business' in s: return 'Private'
+    return str(st).strip()
+
+def map_state(city):
+    mapped = CITY_TO_STATE_DB.get(str(city).strip().lower())
+    return mapped if mapped is not None else city
+
+def normalize_country(country):
+    c = str(country).strip().upper()
+    return 'UNKNOWN' if c in ['NAN', '', 'NONE', 'NULL', 'NAM'] else c
+
+def is_nigeria(country):
+    return isinstance(country, str) and 'NIGERIA' in country.upper()
+
+# --- CATEGORICAL HELPERS ---
+# Rules are evaluated once per distinct value and expanded back to rows through
+# integer codes, so millions of rows cost a handful of Python calls and no
+# per-row string copies.
+
+def expand_distinct(codes, mapped_values):
+    """Categorical (sorted categories, NaN -> missing) from per-distinct results."""
+    new_codes, categories = pd.factorize(pd.Index(mapped_values, dtype=object), sort=True)
+    return pd.Categorical.from_codes(new_codes[codes], categories=categories)
+
+def map_distinct(values, func):
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return expand_distinct(codes, [func(v) for v in uniques])
+
+def flag_distinct(values, predicate):
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.array([bool(predicate(v)) for v in uniques], dtype=bool)[codes]
+
+# --- DEDUPLICATION ---
+class DuplicateFilter:
     """
-    uploaded_files: List of FileStorage objects from Flask
-    target_month: int
-    target_year: int
+    Drops rows whose key was already seen, in the same file or an earlier one.
+    Keys are kept as 64-bit hashes in one sorted uint64 array (8 bytes per
+    distinct row), so millions of rows never hold their key strings.
+    """
+    def __init__(self, key):
+        self.key = list(key)
+        self.seen = np.empty(0, dtype=np.uint64)
+        self.dropped = 0
+        self.unchecked_files = [] # Files without every key column pass through untouched
+
+    def row_hashes(self, df):
+        """
+        One uint64 per row. Each key column is hashed per distinct value (as
+        stripped text, so 123 / '123' / ' 123' match across files) and the
+        column hashes are then combined row-wise.
+        """
+        column_hashes = {}
+        for col in self.key:
+            codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+            text = np.array([str(v).strip() for v in uniques], dtype=object)
+            column_hashes[col] = pd.util.hash_array(text)[codes]
+        return pd.util.hash_pandas_object(pd.DataFrame(column_hashes), index=False).to_numpy(dtype=np.uint64)
+
+    def filter(self, df, filename):
+        if not self.key or df.empty:
+            return df
+        if any(col not in df.columns for col in self.key):
+            self.unchecked_files.append(filename)
+            return df
+
+        hashes = self.row_hashes(df)
+
+        keep = ~pd.Series(hashes).duplicated().to_numpy() # First occurrence within this file
+        if len(self.seen):
+            pos = np.searchsorted(self.seen, hashes)
+            pos[pos == len(self.seen)] = 0
+            keep &= self.seen[pos] != hashes
+
+        new = np.sort(hashes[keep])
+        self.seen = np.insert(self.seen, np.searchsorted(self.seen, new), new) # Linear merge, stays sorted
+        dropped = len(df) - int(keep.sum())
+        if not dropped:
+            return df
+        self.dropped += dropped
+        return df[keep].reset_index(drop=True)
+
+def get_travel_types(df):
+    """Domestic if countries match or either one is unknown, otherwise International."""
+    blank = pd.Series('', index=df.index)
+    o_codes, o_uniques = pd.factorize(df.get('origin_country', blank), use_na_sentinel=False)
+    d_codes, d_uniques = pd.factorize(df.get('destination_country', blank), use_na_sentinel=False)
+    o_norm = [normalize_country(v) for v in o_uniques]
+    d_norm = [normalize_country(v) for v in d_uniques]
+
+    # Shared code space so both sides can be compared as integers
+    shared = pd.Index(list(dict.fromkeys(o_norm + d_norm + ['UNKNOWN'])))
+    unknown = shared.get_loc('UNKNOWN')
+    o_ids = shared.get_indexer(o_norm)[o_codes]
+    d_ids = shared.get_indexer(d_norm)[d_codes]
+
+    domestic = (o_ids == d_ids) | (o_ids == unknown) | (d_ids == unknown)
+    return pd.Categorical.from_codes(np.where(domestic, 0, 1).astype(np.int8), categories=['Domestic', 'International'])
+
+def build_flight_report(df):
+    """
+    Counts flights per airport / state / category / travel type / month / status.
+    Departures and arrivals are aggregated separately on categorical columns,
+    so the unpivoted (2x rows) frame is never materialized.
+    """
+    output_cols = ['Airport Name', 'Airport State', 'Category of Flight', 'Travel Type', 'Month Name', 'Year', 'Flight Status']
+
+    # Logic: Travel Type & Categories
+    travel_type = get_travel_types(df)
+    if 'service_type' in df.columns:
+        category = map_distinct(df['service_type'], map_category)
+    else:
+        category = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), categories=['Unknown'])
+
+    # Logic: Dates (only the few distinct forced dates are parsed)
+    date_codes, date_uniques = pd.factorize(df['date_takeoff'], use_na_sentinel=False)
+    parsed = pd.to_datetime(pd.Series(date_uniques, dtype=object), dayfirst=True, errors='coerce')
+    valid_date = parsed.notna().to_numpy()[date_codes]
+    month_name = expand_distinct(date_codes, [d.month_name() if pd.notna(d) else None for d in parsed])
+    year = expand_distinct(date_codes, [d.year if pd.notna(d) else None for d in parsed])
+
+    # Logic: Unpivot (Dep/Arr counted separately), Filter Nigeria & Map States
+    sides = [('Departure', 'origin'), ('Arrival', 'destination')]
+    side_reports = []
+    for status, prefix in sides:
+        keep = flag_distinct(df[f'{prefix}_country'], is_nigeria) & valid_date
+        side = pd.DataFrame({
+            'Airport Name': map_distinct(df[f'{prefix}_name'][keep], standardize_airport_name),
+            'Airport State': map_distinct(df[f'{prefix}_city'][keep], map_state),
+            'Category of Flight': category[keep],
+            'Travel Type': travel_type[keep],
+            'Month Name': month_name[keep],
+            'Year': year[keep],
+        })
+        counts = side.groupby(list(side.columns), observed=True).size().reset_index(name='Number of Flights')
+        counts.insert(len(output_cols) - 1, 'Flight Status', status)
+        side_reports.append(counts)
+
+    # Logic: Group By (both sides share the key order, so a sort merges them)
+    report = pd.concat(side_reports, ignore_index=True)
+    report = report.sort_values(output_cols).reset_index(drop=True)
+    report['Year'] = report['Year'].astype(int)
+    return report
+
+def first_takeoff_date(temp_df):
+    """Timestamp of the first non-empty date_takeoff (Excel serial or text), or None."""
+    if 'date_takeoff' not in temp_df.columns or not temp_df['date_takeoff'].notna().any():
+        return None
+    raw_val = temp_df['date_takeoff'].dropna().iloc[0]
+    try:
+        # Handle Excel Serial Dates
+        if isinstance(raw_val, (int, float)) or (isinstance(raw_val, str) and raw_val.isdigit()):
+            serial = float(raw_val)
+            return pd.Timestamp('1899-12-30') + pd.to_timedelta(serial, unit='D')
+        # Handle String Dates
+        raw_str = str(raw_val).strip()
+        if re.match(r'^\d{4}', raw_str):
+            return pd.to_datetime(raw_str, errors='raise')
+        return pd.to_datetime(raw_str, dayfirst=True, errors='raise')
+    except:
+        return None
+
+def ingest_flight_files(uploaded_files, target_month, target_year, dedup):
+    """
+    Reads each daily export, drops duplicates and forces date_takeoff into the
+    target month. Returns (list of frames, rows read).
     """
     all_daily_data = []
-    
-    # --- 1. FILE INGESTION ---
+    rows_read = 0
+
     for file in uploaded_files:
-        filename = file.filename
+        filename = upload_name(file)
         try:
-            # Read directly from memory (Flask FileStorage)
-            try:
-                temp_df = pd.read_csv(file, sep='\t')
-                if temp_df.shape[1] < 2: 
-                    file.seek(0) # Reset pointer
-                    temp_df = pd.read_csv(file, sep=',')
-            except:
-                file.seek(0)
-                temp_df = pd.read_csv(file, sep=',')
+            # Single pass straight from the spooled upload (tab vs comma sniffed from the header)
+            temp_df = read_delimited_upload(file)
 
             # Janitor
             temp_df.columns = temp_df.columns.str.strip().str.lower()
+            rows_read += len(temp_df)
+
+            # Repeats across overlapping exports (hashed before the date is forced below)
+            temp_df = dedup.filter(temp_df, filename)
             if temp_df.empty: continue
 
             # Smart Date Logic (Preserved from your script)
             if 'date_takeoff' in temp_df.columns and temp_df['date_takeoff'].notna().any():
-                raw_val = temp_df['date_takeoff'].dropna().iloc[0]
-                day_num = 1
-                try:
-                    # Handle Excel Serial Dates
-                    if isinstance(raw_val, (int, float)) or (isinstance(raw_val, str) and raw_val.isdigit()):
-                        serial = float(raw_val)
-                        temp_date = pd.Timestamp('1899-12-30') + pd.to_timedelta(serial, unit='D')
-                        day_num = temp_date.day
-                    else:
-                        # Handle String Dates
-                        raw_str = str(raw_val).strip()
-                        if re.match(r'^\d{4}', raw_str):
-                            temp_date = pd.to_datetime(raw_str, errors='raise')
-                        else:
-                            temp_date = pd.to_datetime(raw_str, dayfirst=True, errors='raise')
-                        day_num = temp_date.day
-                except:
-                    pass # Keep day_num = 1 if parse fails
+                temp_date = first_takeoff_date(temp_df)
+                day_num = temp_date.day if temp_date is not None else 1 # Keep day 1 if parse fails
 
                 forced_date = f"{day_num}/{target_month}/{target_year}"
                 temp_df['date_takeoff'] = forced_date
@@ -91,75 +247,191 @@ def process_flight_files(uploaded_files, target_month, target_year, download_fol
             print(f"Error reading {filename}: {e}")
             continue
 
+    return all_daily_data, rows_read
+
+def write_report_sheet(writer, report, sheet_name):
+    report.to_excel(writer, index=False, sheet_name=sheet_name)
+    worksheet = writer.sheets[sheet_name]
+    # Auto-width
+    for i, col in enumerate(report.columns):
+        max_len = max(report[col].astype(str).map(len).max(), len(col)) + 2
+        worksheet.set_column(i, i, max_len)
+
+def process_flight_files(uploaded_files, target_month, target_year, download_folder, dedup_key=None, stats=None, fmt='xlsx'):
+    """
+    uploaded_files: List of FileStorage objects from Flask (or binary file objects)
+    target_month: int
+    target_year: int
+    dedup_key: columns identifying a flight (default FLIGHT_DEDUP_KEY, [] to keep duplicates)
+    stats: optional dict, filled with rows_read / duplicates_dropped / unchecked_files
+    fmt: 'xlsx', 'parquet' or 'csv.gz'
+    """
+    dedup = DuplicateFilter(FLIGHT_DEDUP_KEY if dedup_key is None else dedup_key)
+    
+    # --- 1. FILE INGESTION ---
+    all_daily_data, rows_read = ingest_flight_files(uploaded_files, target_month, target_year, dedup)
+
+    if stats is not None:
+        stats.update(rows_read=rows_read, duplicates_dropped=dedup.dropped, unchecked_files=dedup.unchecked_files)
+    if dedup.dropped:
+        print(f"Dropped {dedup.dropped} duplicate flight rows out of {rows_read}")
+
     if not all_daily_data:
         return None
 
     # --- 2. MERGE & PROCESS ---
     df = pd.concat(all_daily_data, ignore_index=True)
+    del all_daily_data
 
-    # Logic: Travel Type
-    def get_travel_type(row):
-        o = str(row.get('origin_country', '')).strip().upper()
-        d = str(row.get('destination_country', '')).strip().upper()
-        if o in ['NAN', '', 'NONE', 'NULL', 'NAM']: o = 'UNKNOWN'
-        if d in ['NAN', '', 'NONE', 'NULL', 'NAM']: d = 'UNKNOWN'
-        return 'Domestic' if (o == d) or (o == 'UNKNOWN') or (d == 'UNKNOWN') else 'International'
-    
-    df['Travel Type'] = df.apply(get_travel_type, axis=1)
-
-    # Logic: Categories
-    def map_category(st):
-        s = str(st).strip().lower()
-        if s in ['general aviation', 'other', 'others', 'non-categorised']: return 'General Aviation'
-        if s == 'passenger': return 'Commercial'
-        if 'business' in s: return 'Private'
-        return str(st).strip()
-    
-    if 'service_type' in df.columns:
-        df['Category of Flight'] = df['service_type'].apply(map_category)
-    else:
-        df['Category of Flight'] = 'Unknown'
+    report = build_flight_report(df)
 
-    # Logic: Unpivot (Split Dep/Arr)
-    dep_cols = {'origin_city': 'Airport State', 'origin_name': 'Airport Name', 'origin_country': 'Airport Country', 'date_takeoff': 'Date'}
-    arr_cols = {'destination_city': 'Airport State', 'destination_name': 'Airport Name', 'destination_country': 'Airport Country', 'date_takeoff': 'Date'}
-    common = ['Travel Type', 'Category of Flight']
+    # --- 3. SAVE ---
+    stem = f"Flight_Data_Summary_{target_month}_{target_year}"
+    save_aggregate('flight', stem, report)
+    fmt = export_format(fmt)
+    if fmt != 'xlsx':
+        return export_tables({'Report': report}, download_folder, stem, fmt)
 
-    df_dep = df[list(dep_cols.keys()) + common].copy().rename(columns=dep_cols)
-    df_dep['Flight Status'] = 'Departure'
-    
-    df_arr = df[list(arr_cols.keys()) + common].copy().rename(columns=arr_cols)
-    df_arr['Flight Status'] = 'Arrival'
+    out_name = f"{stem}.xlsx"
+    out_path = os.path.join(download_folder, out_name)
+    with pd.ExcelWriter(out_path, engine='xlsxwriter') as writer:
+        write_report_sheet(writer, report, 'Report')
+            
+    return out_name
 
-    df_final = pd.concat([df_dep, df_arr], ignore_index=True)
+# --- MULTI-MONTH MODE ---
+# Files are grouped by the month of their own takeoff dates and each month is
+# aggregated in its own process, so a quarter or a year takes about as long as
+# its largest month once there are enough cores.
+FLIGHT_MONTH_WORKERS = int(os.environ.get('FLIGHT_MONTH_WORKERS', 0)) # 0 = one per CPU core
+MONTH_SNIFF_ROWS = 200 # Rows read up front to find a file's month
 
-    # Logic: Filter Nigeria & Map States
-    df_final = df_final[df_final['Airport Country'].str.upper().str.contains('NIGERIA', na=False)]
-    
-    df_final['Mapped_State'] = df_final['Airport State'].astype(str).str.strip().str.lower().map(CITY_TO_STATE_DB)
-    df_final['Airport State'] = df_final['Mapped_State'].fillna(df_final['Airport State'])
-    
-    df_final['Airport Name'] = df_final['Airport Name'].apply(standardize_airport_name)
+def file_month(path):
+    """(year, month) of a daily export, from its first takeoff date; None if it has none."""
+    with open(path, 'rb') as f:
+        head = read_delimited_upload(f, nrows=MONTH_SNIFF_ROWS)
+    head.columns = head.columns.str.strip().str.lower()
+    temp_date = first_takeoff_date(head)
+    if temp_date is None and 'date_takeoff' in head.columns and len(head) == MONTH_SNIFF_ROWS:
+        # No date in the first rows: read the whole date column
+        with open(path, 'rb') as f:
+            dates = read_delimited_upload(f, usecols=lambda c: c.strip().lower() == 'date_takeoff')
+        dates.columns = ['date_takeoff']
+        temp_date = first_takeoff_date(dates)
+    if temp_date is None or pd.isna(temp_date):
+        return None
+    return temp_date.year, temp_date.month
 
-    # Logic: Dates
-    df_final['Date'] = pd.to_datetime(df_final['Date'], dayfirst=True, errors='coerce')
-    df_final['Year'] = df_final['Date'].dt.year
-    df_final['Month Name'] = df_final['Date'].dt.month_name()
+def month_report_job(paths, target_month, target_year, dedup_key):
+    """One month's report (runs in a worker process). Returns (report or None, stats)."""
+    files = [open(p, 'rb') for p in paths]
+    try:
+        dedup = DuplicateFilter(FLIGHT_DEDUP_KEY if dedup_key is None else dedup_key)
+        all_daily_data, rows_read = ingest_flight_files(files, target_month, target_year, dedup)
+    finally:
+        for f in files:
+            f.close()
 
-    # Logic: Group By
-    output_cols = ['Airport Name', 'Airport State', 'Category of Flight', 'Travel Type', 'Month Name', 'Year', 'Flight Status']
-    report = df_final.groupby(output_cols).size().reset_index(name='Number of Flights')
+    stats = {'rows_read': rows_read, 'duplicates_dropped': dedup.dropped, 'unchecked_files': dedup.unchecked_files}
+    if not all_daily_data:
+        return None, stats
+    df = pd.concat(all_daily_data, ignore_index=True)
+    del all_daily_data
+    return build_flight_report(df), stats
+
+def month_pool_context():
+    """
+    forkserver where available: workers fork from a clean helper process instead
+    of a (possibly multi-threaded) web worker, with this module preloaded.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['scrapers.flight_processor'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+def process_flight_files_by_month(uploaded_files, download_folder, dedup_key=None, stats=None, workers=None, fmt='xlsx'):
+    """
+    Multi-month report: one sheet per month found in the files plus a Combined sheet
+    (for parquet / csv.gz: a ZIP with one file per sheet).
+    Duplicates are dropped within each month's files.
+    stats: optional dict, also filled with months / undated_files
+    """
+    rows_read, duplicates_dropped, unchecked_files, undated_files = 0, 0, [], []
+    reports = {}
+
+    with tempfile.TemporaryDirectory(prefix='flight_months_') as tmp_dir:
+        # --- 1. GROUP FILES BY MONTH ---
+        months = {}
+        for i, file in enumerate(uploaded_files):
+            filename = upload_name(file)
+            try:
+                path = save_upload(file, os.path.join(tmp_dir, str(i))) # Keeps the original name
+                period = file_month(path)
+            except Exception as e:
+                print(f"Error reading {filename}: {e}")
+                continue
+            if period is None:
+                undated_files.append(filename)
+                continue
+            months.setdefault(period, []).append(path)
+
+        # --- 2. AGGREGATE EACH MONTH ---
+        periods = sorted(months)
+        workers = min(workers or FLIGHT_MONTH_WORKERS or os.cpu_count() or 1, len(periods))
+        if workers <= 1:
+            results = {(year, month): month_report_job(months[(year, month)], month, year, dedup_key) for year, month in periods}
+        else:
+            results = {}
+            with ProcessPoolExecutor(max_workers=workers, mp_context=month_pool_context()) as pool:
+                futures = {
+                    pool.submit(month_report_job, months[(year, month)], month, year, dedup_key): (year, month)
+                    for year, month in periods
+                }
+                for future in as_completed(futures):
+                    year, month = futures[future]
+                    try:
+                        results[(year, month)] = future.result()
+                    except Exception as e:
+                        print(f"Error processing {calendar.month_name[month]} {year}: {e}")
+
+    for period in periods:
+        if period not in results:
+            continue
+        report, month_stats = results[period]
+        rows_read += month_stats['rows_read']
+        duplicates_dropped += month_stats['duplicates_dropped']
+        unchecked_files += month_stats['unchecked_files']
+        if report is not None:
+            reports[period] = report
+
+    if stats is not None:
+        stats.update(
+            rows_read=rows_read, duplicates_dropped=duplicates_dropped, unchecked_files=unchecked_files,
+            undated_files=undated_files, months=[f"{calendar.month_abbr[m]} {y}" for y, m in reports]
+        )
+    if duplicates_dropped:
+        print(f"Dropped {duplicates_dropped} duplicate flight rows out of {rows_read}")
+
+    if not reports:
+        return None
 
     # --- 3. SAVE ---
-    out_name = f"Flight_Data_Summary_{target_month}_{target_year}.xlsx"
-    out_path = os.path.join(download_folder, out_name)
+    (first_year, first_month), (last_year, last_month) = min(reports), max(reports)
+    stem = f"Flight_Data_Summary_{first_year}-{first_month:02d}_to_{last_year}-{last_month:02d}"
+    combined = pd.concat(reports.values(), ignore_index=True) # Months in calendar order
+    save_aggregate('flight', stem, combined)
+    fmt = export_format(fmt)
+    if fmt != 'xlsx':
+        tables = {'Combined': combined}
+        tables.update((f"{calendar.month_abbr[month]} {year}", report) for (year, month), report in reports.items())
+        return export_tables(tables, download_folder, stem, fmt)
 
+    out_name = f"{stem}.xlsx"
+    out_path = os.path.join(download_folder, out_name)
     with pd.ExcelWriter(out_path, engine='xlsxwriter') as writer:
-        report.to_excel(writer, index=False, sheet_name='Report')
-        worksheet = writer.sheets['Report']
-        # Auto-width
-        for i, col in enumerate(report.columns):
-            max_len = max(report[col].astype(str).map(len).max(), len(col)) + 2
-            worksheet.set_column(i, i, max_len)
-            
-    return out_name
\ No newline at end of file
+        write_report_sheet(writer, combined, 'Combined')
+        for (year, month), report in reports.items():
+            write_report_sheet(writer, report, f"{calendar.month_abbr[month]} {year}")
+
+    return out_name
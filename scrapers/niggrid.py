@@ -0,0 +1,320 @@
+import importlib
+import os
+from abc import ABC, abstractmethod
+import pandas as pd
+from datetime import date, datetime, timedelta
+from io import StringIO
+from scrapers.niggrid_store import NIGGRID_DATA_FOLDER, load_day, save_day, missing_days, is_published
+from scrapers.exporters import export_format, export_tables
+from scrapers.progress import console_progress
+
+# --- NIGGRID SCRAPING INTERFACE ---
+# One entry point for the Grid Harvester. Pages are fetched through pluggable
+# backends (plain HTTP by default, a pooled Playwright browser as fallback),
+# and everything after the HTML goes through the same parsing / pivot / report
+# code below.
+
+TARGET_URL = os.environ.get('NIGGRID_URL', "https://niggrid.org/GenerationProfile2")
+
+# 'auto' tries HTTP first for each day and escalates to the browser only if needed
+NIGGRID_BACKEND = os.environ.get('NIGGRID_BACKEND', 'auto')
+ESCALATE_AFTER_FAILURES = 3 # Consecutive HTTP misses before the rest of a run goes straight to the browser
+
+BACKENDS = {
+    'http': ('scrapers.niggrid_scraper', 'HttpBackend'),
+    'playwright': ('scrapers.niggrid_scraper_pw', 'PlaywrightBackend'),
+}
+
+# --- MASTER LIST (ORDER IS CRITICAL) ---
+# Used for:
+# 1. Matching (Specific names first to avoid partial match errors)
+# 2. Reporting (These rows appear FIRST in this exact order)
+GENCO_MASTER_LIST = [
+    "AFAM III FAST POWER", "AFAM VI (GAS/STEAM)", "AZURA-EDO IPP (GAS)",
+    "DADINKOWA G.S (HYDRO)", "DELTA (GAS)", "EGBIN (STEAM)",
+    "GEREGU NIPP (GAS)",        # Checked before generic Geregu
+    "GEREGU (GAS)",             # Generic
+    "GPAL (GAS)", "IBOM POWER (GAS)", "IHOVBOR NIPP (GAS)",
+    "JEBBA (HYDRO)", "KAINJI (HYDRO)", "ODUKPANI NIPP (GAS)", "OKPAI (GAS/STEAM)",
+    "OLORUNSOGO NIPP (GAS)",    # Checked before generic
+    "OLORUNSOGO (GAS)",         # Generic
+    "OMOKU (GAS)",
+    "OMOTOSHO NIPP (GAS)",      # Checked before generic
+    "OMOTOSHO (GAS)",           # Generic
+    "PARAS ENERGY (GAS)", "RIVERS IPP (GAS)",
+    "SAPELE NIPP (GAS)",        # Checked before generic
+    "SAPELE (STEAM)",           # Generic
+    "SHIRORO (HYDRO)", "TRANS AFAM POWER", "TRANS-AMADI (GAS)",
+    "ZUNGERU", "KASHIMBILA GS"
+]
+
+def standardize_name(raw_name):
+    """Matches raw website names to your official Master List."""
+    if not isinstance(raw_name, str): return str(raw_name)
+    clean_raw = raw_name.lower().strip()
+
+    # 1. Try to find in Master List
+    for master_name in GENCO_MASTER_LIST:
+        clean_master_key = master_name.lower().split('(')[0].strip()
+        if clean_master_key in clean_raw:
+            return master_name.title() # Return Title Case
+
+    # 2. If NO match found (New Station!), return it Title Cased
+    return raw_name.title()
+
+def get_date_range(start_str, end_str):
+    start = datetime.strptime(start_str, "%Y-%m-%d").date()
+    end = datetime.strptime(end_str, "%Y-%m-%d").date()
+    return [start + timedelta(days=x) for x in range((end - start).days + 1)]
+
+# --- BACKENDS ---
+class ScraperBackend(ABC):
+    """Fetches the generation profile page for one day."""
+    name = ''
+
+    @abstractmethod
+    def fetch_day_html(self, current_date):
+        """Page HTML for the day, or None; may raise (DayFetcher reports it and moves on)."""
+
+    def close(self):
+        pass
+
+def create_backend(name):
+    module_name, class_name = BACKENDS[name]
+    return getattr(importlib.import_module(module_name), class_name)()
+
+class DayFetcher:
+    """
+    Per-day backend selection. In 'auto' mode each day tries the HTTP backend
+    first and escalates to the browser only when HTTP fails or returns no
+    generation table. Backends are created on first use.
+    progress: optional callback, see scrapers.progress (errors only)
+    """
+    def __init__(self, mode=NIGGRID_BACKEND, progress=None):
+        self.progress = progress or console_progress
+        self.chain = ['http', 'playwright'] if mode == 'auto' else [mode]
+        self.backends = {}
+        self.unavailable = set() # Backends whose dependencies aren't installed
+        self.http_failures = 0
+
+    def _backend(self, name):
+        if name not in self.backends:
+            self.backends[name] = create_backend(name)
+        return self.backends[name]
+
+    def fetch(self, current_date, escalate=True):
+        """
+        Raw generation table for one day, or None if every backend failed.
+        escalate: False to stop after the first backend (e.g. today, whose
+        table may simply not be there yet)
+        """
+        chain = self.chain
+        if len(chain) > 1 and self.http_failures >= ESCALATE_AFTER_FAILURES:
+            chain = chain[1:] # HTTP keeps failing today; stop paying for it
+        if not escalate:
+            chain = chain[:1]
+
+        for name in chain:
+            if name in self.unavailable:
+                continue
+            html = None
+            try:
+                html = self._backend(name).fetch_day_html(current_date)
+                df = parse_day_html(html)
+            except ImportError as e:
+                self.progress('error', f"{name} backend unavailable: {e}", backend=name)
+                self.unavailable.add(name)
+                continue
+            except Exception as e:
+                self.progress('error', f"Error on {current_date} ({name}): {type(e).__name__}", backend=name, day=current_date)
+                df = None
+
+            if name == 'http':
+                # Only requests that failed count; a page without a table may just be a day without data
+                self.http_failures = 0 if html else self.http_failures + 1
+            if df is not None:
+                return df
+        return None
+
+    def close(self):
+        for backend in self.backends.values():
+            backend.close()
+
+# --- SHARED POST-PROCESSING ---
+def parse_day_html(html):
+    """Largest table on the page, with the station column renamed to Raw_Name."""
+    if not html:
+        return None
+    try:
+        dfs = pd.read_html(StringIO(html), flavor="lxml")
+    except ValueError: # No tables on the page
+        return None
+    if not dfs:
+        return None
+    df = max(dfs, key=len).copy()
+    if df.empty or len(df.columns) < 2:
+        return None
+    df.rename(columns={df.columns[1]: "Raw_Name"}, inplace=True)
+    return df
+
+def tag_day(df, current_date):
+    # Clean & Tag (New stations get Title Cased here)
+    df = df.copy()
+    df["Station_Name"] = df["Raw_Name"].apply(standardize_name)
+    df["Date_Short"] = current_date.strftime("%b-%d")
+    return df
+
+def build_pivot(all_data):
+    """Returns (pivot, full_df): station x day daily totals plus the tagged raw rows."""
+    full_df = pd.concat(all_data, ignore_index=True)
+
+    # Numeric Conversion
+    hour_cols = [c for c in full_df.columns if ":00" in str(c)]
+    if not hour_cols: hour_cols = full_df.columns[2:26]
+    for col in hour_cols:
+        full_df[col] = pd.to_numeric(full_df[col], errors='coerce').fillna(0)
+
+    # Calculate Daily Total
+    full_df['Daily_Total'] = full_df[hour_cols].sum(axis=1)
+
+    # Pivot Matrix
+    pivot = full_df.pivot_table(
+        index='Station_Name',
+        columns='Date_Short',
+        values='Daily_Total',
+        aggfunc='sum'
+    )
+
+    # --- HYBRID SORTING LOGIC ---
+    # Known stations first in Master List order, then new stations alphabetically.
+    # Reindexing also keeps 0-value rows for known stations.
+    known_stations = [x.title() for x in GENCO_MASTER_LIST]
+    new_stations = sorted(s for s in pivot.index.tolist() if s not in known_stations)
+    pivot = pivot.reindex(known_stations + new_stations, fill_value=0)
+
+    # Add Totals
+    pivot['MONTHLY_TOTAL'] = pivot.sum(axis=1)
+    pivot.loc['DAILY_GRID_TOTAL'] = pivot.sum()
+    return pivot, full_df
+
+def write_report(pivot, full_df, start_date, end_date, download_folder, fmt='xlsx'):
+    """Garamond-styled workbook, or a ZIP of both tables for fmt 'parquet' / 'csv.gz'."""
+    stem = f"NIGGRID_Report_{start_date}_to_{end_date}"
+    fmt = export_format(fmt)
+    if fmt != 'xlsx':
+        return export_tables({'Station_Totals': pivot.reset_index(), 'Raw_Data': full_df}, download_folder, stem, fmt)
+
+    # --- SAVE & FORMAT (GARAMOND) ---
+    filename = f"{stem}.xlsx"
+    filepath = os.path.join(download_folder, filename)
+
+    with pd.ExcelWriter(filepath, engine='xlsxwriter') as writer:
+        pivot.to_excel(writer, sheet_name='Station_Totals')
+        full_df.to_excel(writer, sheet_name='Raw_Data', index=False)
+
+        workbook = writer.book
+
+        # Styles
+        header_fmt = workbook.add_format({'bold': True, 'font_name': 'Garamond', 'font_size': 12, 'bg_color': '#D9E1F2', 'border': 1, 'align': 'center'})
+        body_fmt = workbook.add_format({'font_name': 'Garamond', 'font_size': 11})
+        number_fmt = workbook.add_format({'font_name': 'Garamond', 'font_size': 11, 'num_format': '#,##0'})
+        total_fmt = workbook.add_format({'bold': True, 'font_name': 'Garamond', 'font_size': 11, 'num_format': '#,##0', 'bg_color': '#F2F2F2'})
+
+        ws = writer.sheets['Station_Totals']
+
+        # Apply Column Widths & Formats
+        ws.set_column(0, 0, 30, body_fmt)
+        ws.set_column(1, len(pivot.columns)-1, 12, number_fmt)
+        ws.set_column(len(pivot.columns), len(pivot.columns), 15, total_fmt) # Last col
+
+        # Apply Header Format
+        for col_num, value in enumerate(pivot.columns.values):
+            ws.write(0, col_num + 1, value, header_fmt)
+
+        # Apply Bottom Row Format
+        ws.set_row(len(pivot), None, total_fmt)
+
+    return filename
+
+# --- ENTRY POINTS ---
+def sync_days(days, store_folder=NIGGRID_DATA_FOLDER, backend=NIGGRID_BACKEND, progress=None):
+    """
+    Fetches every published day in `days` that isn't in the local store yet.
+    Days that fail or come back empty are simply retried on the next sync.
+    Returns the list of days saved.
+    """
+    progress = progress or console_progress
+    todo = [d for d in missing_days(days, store_folder) if is_published(d)]
+    saved = []
+    if not todo:
+        return saved
+
+    progress('start', f"Fetching {len(todo)} day(s)", total=len(todo))
+    fetcher = DayFetcher(backend, progress)
+    try:
+        for i, current_date in enumerate(todo, 1):
+            df = fetcher.fetch(current_date)
+            if df is not None:
+                save_day(current_date, df, store_folder)
+                saved.append(current_date)
+            status = 'fetched' if df is not None else 'missing'
+            progress('day', f"{current_date}: {status}", day=current_date, status=status, current=i, total=len(todo))
+    finally:
+        fetcher.close()
+    return saved
+
+def stored_pivot(start_date, end_date, store_folder=NIGGRID_DATA_FOLDER):
+    """Pivot built from stored days only (never scrapes). None if no day is stored."""
+    all_data = []
+    for current_date in get_date_range(start_date, end_date):
+        df = load_day(current_date, store_folder)
+        if df is not None:
+            all_data.append(tag_day(df, current_date))
+    if not all_data:
+        return None
+    return build_pivot(all_data)[0]
+
+def run_scraper(start_date, end_date, download_folder, store_folder=NIGGRID_DATA_FOLDER, backend=NIGGRID_BACKEND, fmt='xlsx', progress=None):
+    """
+    Builds the report from the local day store, scraping only the days that
+    aren't stored yet (and storing them once they are published).
+    backend: 'auto', 'http' or 'playwright'
+    fmt: 'xlsx', 'parquet' or 'csv.gz'
+    progress: optional callback, gets a 'day' event per day (status stored /
+    fetched / missing / unpublished). Days after today are not requested, and
+    today (not published yet) only over HTTP.
+    """
+    progress = progress or console_progress
+    os.makedirs(download_folder, exist_ok=True)
+
+    date_list = get_date_range(start_date, end_date)
+    all_data = []
+    fetcher = DayFetcher(backend, progress)
+    progress('start', f"Collecting {len(date_list)} day(s)", total=len(date_list))
+
+    try:
+        for i, current_date in enumerate(date_list, 1):
+            df = load_day(current_date, store_folder)
+            status = 'stored'
+
+            if df is None and current_date > date.today():
+                status = 'unpublished'
+            elif df is None:
+                published = is_published(current_date)
+                df = fetcher.fetch(current_date, escalate=published)
+                status = 'fetched' if df is not None else ('missing' if published else 'unpublished')
+                if df is not None and published:
+                    save_day(current_date, df, store_folder)
+
+            progress('day', f"{current_date}: {status}", day=current_date, status=status, current=i, total=len(date_list))
+            if df is not None:
+                all_data.append(tag_day(df, current_date))
+    finally:
+        fetcher.close()
+
+    if not all_data:
+        return None
+
+    pivot, full_df = build_pivot(all_data)
+    progress('report', f"Writing report for {len(all_data)} day(s)")
+    return write_report(pivot, full_df, start_date, end_date, download_folder, fmt)
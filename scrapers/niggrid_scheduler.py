@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError: # Windows: no cross-process lock, fine for the dev server
+    fcntl = None
+
+# --- SCHEDULER CONFIGURATION ---
+NIGGRID_SYNC_INTERVAL_HOURS = float(os.environ.get('NIGGRID_SYNC_INTERVAL_HOURS', 6))
+NIGGRID_BACKFILL_DAYS = int(os.environ.get('NIGGRID_BACKFILL_DAYS', 14)) # Missing days in this window are retried
+
+_lock_handle = None # Held from the first tick that gets it, for the life of the process
+
+def sync_recent(backfill_days=NIGGRID_BACKFILL_DAYS, store_folder=None):
+    """Stores every published day in the backfill window that is still missing."""
+    from scrapers.niggrid_store import NIGGRID_DATA_FOLDER, recent_days
+    from scrapers.niggrid import sync_days
+    return sync_days(recent_days(backfill_days), store_folder or NIGGRID_DATA_FOLDER)
+
+def _acquire_lock(store_folder):
+    """Only one process (e.g. one gunicorn worker) syncs; True once this one holds the lock."""
+    global _lock_handle
+    if fcntl is None or _lock_handle is not None:
+        return True
+    os.makedirs(store_folder, exist_ok=True)
+    handle = open(os.path.join(store_folder, '.scheduler.lock'), 'w')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _lock_handle = handle
+    return True
+
+def _run_forever(interval_hours, backfill_days, store_folder):
+    while True:
+        try:
+            # Every worker keeps trying, so another one takes over when the owner exits
+            if _acquire_lock(store_folder):
+                saved = sync_recent(backfill_days, store_folder)
+                if saved:
+                    print(f"NIGGRID scheduler stored {len(saved)} day(s): {saved[0]} .. {saved[-1]}")
+        except Exception as e:
+            print(f"NIGGRID scheduler error: {type(e).__name__}: {e}")
+        time.sleep(interval_hours * 3600)
+
+def start_scheduler(interval_hours=NIGGRID_SYNC_INTERVAL_HOURS, backfill_days=NIGGRID_BACKFILL_DAYS, store_folder=None):
+    """
+    Starts the background sync thread. Each tick it syncs only if this process
+    holds the store's lock (taking it when it is free), so one process at a
+    time does the work. Returns the thread.
+    """
+    if store_folder is None:
+        store_folder = os.environ.get('NIGGRID_DATA_FOLDER', os.path.join(os.getcwd(), 'data', 'niggrid'))
+
+    thread = threading.Thread(
+        target=_run_forever,
+        args=(interval_hours, backfill_days, store_folder),
+        name='niggrid-scheduler',
+        daemon=True
+    )
+    thread.start()
+    return thread
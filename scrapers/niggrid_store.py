@@ -0,0 +1,56 @@
+import os
+import pandas as pd
+from datetime import date, timedelta
+
+# --- LOCAL DAY STORE ---
+# One pickle per day holding the generation table as scraped (before name
+# standardization), so reports for stored days never touch the network.
+# Pickle rather than CSV keeps the table exactly as parsed: multi-row or
+# repeated headers and column dtypes don't survive a CSV round trip.
+NIGGRID_DATA_FOLDER = os.environ.get('NIGGRID_DATA_FOLDER', os.path.join(os.getcwd(), 'data', 'niggrid'))
+
+def day_path(day, store_folder=NIGGRID_DATA_FOLDER):
+    return os.path.join(store_folder, f"{day.isoformat()}.pkl")
+
+def legacy_day_path(day, store_folder=NIGGRID_DATA_FOLDER):
+    """CSV written by earlier versions; still read when a day has no pickle."""
+    return os.path.join(store_folder, f"{day.isoformat()}.csv")
+
+def stored_day_path(day, store_folder=NIGGRID_DATA_FOLDER):
+    """File holding a day, or None if it hasn't been fetched yet."""
+    for path in (day_path(day, store_folder), legacy_day_path(day, store_folder)):
+        if os.path.exists(path):
+            return path
+    return None
+
+def has_day(day, store_folder=NIGGRID_DATA_FOLDER):
+    return stored_day_path(day, store_folder) is not None
+
+def load_day(day, store_folder=NIGGRID_DATA_FOLDER):
+    """Stored table for a day, or None if it hasn't been fetched yet."""
+    path = stored_day_path(day, store_folder)
+    if path is None:
+        return None
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    return pd.read_pickle(path)
+
+def save_day(day, df, store_folder=NIGGRID_DATA_FOLDER):
+    """Writes atomically so a reader never sees a half-written day."""
+    os.makedirs(store_folder, exist_ok=True)
+    path = day_path(day, store_folder)
+    tmp_path = path + '.tmp'
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+def is_published(day):
+    """A day's profile is only complete once the day is over."""
+    return day < date.today()
+
+def missing_days(days, store_folder=NIGGRID_DATA_FOLDER):
+    return [d for d in days if not has_day(d, store_folder)]
+
+def recent_days(backfill_days):
+    """The last `backfill_days` published days, oldest first."""
+    yesterday = date.today() - timedelta(days=1)
+    return [yesterday - timedelta(days=x) for x in range(backfill_days - 1, -1, -1)]
@@ -0,0 +1,200 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import socket
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+
+# --- PROGRESS EVENTS ---
+# Long tool requests (NIGGRID scraping, cargo PDF parsing) report progress
+# through a callback: progress(event, message, **data). Without a job the
+# callback is console_progress, which prints problems like the loops used to.
+# With a job id from the form, events go to an append-only JSON-lines file per
+# job, which the /progress/<job_id> server-sent events route tails. A file
+# rather than memory, so the SSE request may land on a different worker
+# process than the POST doing the work.
+#
+# The tail doesn't poll: each open stream binds a Unix datagram socket and
+# blocks on it; the writer sends a byte to every socket of the job after each
+# event. Socket names are limited to ~107 characters, so they live in a short
+# folder under the temp dir (one per progress folder) with hashed names.
+# Where a socket can't be bound (no AF_UNIX, temp dir path too long) the
+# stream reads again every PROGRESS_FALLBACK_WAIT.
+#
+# Events: start (total), day / page / file (current, total), report, error,
+# done (status)
+PROGRESS_FOLDER = os.environ.get('PROGRESS_FOLDER', os.path.join(os.getcwd(), 'data', 'progress'))
+PROGRESS_RETENTION_HOURS = float(os.environ.get('PROGRESS_RETENTION_HOURS', 1)) # Finished job files older than this are removed
+PROGRESS_KEEPALIVE = 15 # Seconds between SSE comments, so proxies keep the stream open
+PROGRESS_IDLE_TIMEOUT = int(os.environ.get('PROGRESS_IDLE_TIMEOUT', 600)) # Give up on a job that stopped writing
+PROGRESS_FALLBACK_WAIT = 1.0 # Seconds between reads where there are no Unix sockets
+
+JOB_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+def console_progress(event, message, **data):
+    """Default callback: only problems are printed."""
+    if event == 'error':
+        print(message)
+
+def valid_job_id(job_id):
+    return bool(job_id) and bool(JOB_ID_PATTERN.match(job_id))
+
+def channel_path(job_id, folder=PROGRESS_FOLDER):
+    return os.path.join(folder, f"{job_id}.jsonl")
+
+def socket_folder(folder=PROGRESS_FOLDER):
+    """Short folder for the stream sockets of a progress folder."""
+    tag = hashlib.sha1(os.path.abspath(folder).encode()).hexdigest()[:10]
+    return os.path.join(tempfile.gettempdir(), f"progress-{tag}")
+
+def socket_prefix(job_id):
+    return hashlib.sha1(job_id.encode()).hexdigest()[:16]
+
+def prune_channels(folder=PROGRESS_FOLDER, max_age_hours=PROGRESS_RETENTION_HOURS):
+    cutoff = time.time() - max_age_hours * 3600
+    # Job files, and sockets left behind by streams that were killed
+    paths = glob.glob(os.path.join(glob.escape(folder), '*.jsonl'))
+    paths += glob.glob(os.path.join(glob.escape(socket_folder(folder)), '*.sock'))
+    for path in paths:
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass # Another worker got there first
+
+def listener_paths(job_id, folder=PROGRESS_FOLDER):
+    return glob.glob(os.path.join(glob.escape(socket_folder(folder)), f"{socket_prefix(job_id)}.*.sock"))
+
+class ProgressChannel:
+    """Event file of one job. Call it like a progress callback; close() sends 'done'."""
+    def __init__(self, job_id, folder=PROGRESS_FOLDER):
+        os.makedirs(folder, exist_ok=True)
+        prune_channels(folder)
+        self.job_id = job_id
+        self.folder = folder
+        self.file = open(channel_path(job_id, folder), 'a', encoding='utf-8')
+        self.notifier = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) if hasattr(socket, 'AF_UNIX') else None
+
+    def notify(self):
+        """Wakes every stream tailing this job."""
+        if self.notifier is None:
+            return
+        for path in listener_paths(self.job_id, self.folder):
+            try:
+                self.notifier.sendto(b'.', path)
+            except OSError:
+                pass # Stream gone (or its queue is full, in which case it is awake anyway)
+
+    def __call__(self, event, message, **data):
+        console_progress(event, message) # Keep errors in the server log too
+        if self.file.closed:
+            return
+        record = dict(data, event=event, message=message, time=round(time.time(), 3))
+        self.file.write(json.dumps(record, default=str) + '\n')
+        self.file.flush()
+        self.notify()
+
+    def close(self, status='ok', message=''):
+        if not self.file.closed:
+            self('done', message, status=status)
+            self.file.close()
+        if self.notifier is not None:
+            self.notifier.close()
+
+def open_channel(job_id, folder=PROGRESS_FOLDER):
+    """Channel for a job id from a form, or None when there is none (or it is malformed)."""
+    if not valid_job_id(job_id):
+        return None
+    return ProgressChannel(job_id, folder)
+
+def job_exists(job_id, folder=PROGRESS_FOLDER):
+    return os.path.exists(channel_path(job_id, folder))
+
+def _timed_wait(timeout):
+    time.sleep(min(timeout, PROGRESS_FALLBACK_WAIT))
+    return False # Can't tell; the caller just reads again
+
+@contextmanager
+def job_listener(job_id, folder=PROGRESS_FOLDER):
+    """
+    Yields wait(timeout), which blocks until the job writes an event (True) or
+    the timeout passes (False). Without a socket it only sleeps a little and
+    returns False.
+    """
+    sock = None
+    path = os.path.join(socket_folder(folder), f"{socket_prefix(job_id)}.{uuid.uuid4().hex[:12]}.sock")
+    if hasattr(socket, 'AF_UNIX'):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            sock.bind(path)
+        except OSError: # e.g. a temp dir path too long for a socket name
+            sock.close()
+            sock = None
+    if sock is None:
+        yield _timed_wait
+        return
+
+    def wait(timeout):
+        sock.settimeout(timeout)
+        try:
+            sock.recv(64)
+        except (socket.timeout, BlockingIOError): # BlockingIOError for a zero timeout
+            return False
+        sock.setblocking(False) # Drain wake-ups that piled up meanwhile
+        try:
+            while sock.recv(64): pass
+        except BlockingIOError:
+            pass
+        return True
+    try:
+        yield wait
+    finally:
+        sock.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def stream_events(job_id, last_event_id=0, folder=PROGRESS_FOLDER):
+    """
+    Server-sent events for an existing job (see job_exists): every line of its
+    file as it is written, ending after the 'done' event. Event ids are line
+    numbers, so a reconnecting EventSource (Last-Event-ID) resumes where it
+    stopped.
+    """
+    path = channel_path(job_id, folder)
+    yield "retry: 2000\n\n"
+
+    # Listen before the first read, so an event written in between still wakes us
+    with job_listener(job_id, folder) as wait, open(path, encoding='utf-8') as f:
+        line_number = 0
+        pending = ''
+        last_event = last_sent = time.monotonic()
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                # Timed by the clock, since wait() may return early (fallback)
+                now = time.monotonic()
+                if now - last_event >= PROGRESS_IDLE_TIMEOUT:
+                    return # Job died without 'done'
+                if now - last_sent >= PROGRESS_KEEPALIVE:
+                    last_sent = now
+                    yield ": keepalive\n\n" # Also how a gone client is noticed
+                wait(max(0, min(last_sent + PROGRESS_KEEPALIVE, last_event + PROGRESS_IDLE_TIMEOUT) - now))
+                continue
+            pending += chunk
+            if not pending.endswith('\n'):
+                continue # Line still being written
+            line, pending = pending.strip(), ''
+            last_event = time.monotonic()
+            line_number += 1
+            if line_number > last_event_id:
+                last_sent = last_event
+                yield f"id: {line_number}\ndata: {line}\n\n"
+            if json.loads(line).get('event') == 'done':
+                return
@@ -0,0 +1,50 @@
+import os
+import shutil
+import pandas as pd
+
+# --- UPLOAD HELPERS ---
+# Processors accept Flask FileStorage objects (already spooled by the request
+# class in app.py) as well as plain binary file objects opened from disk.
+# These helpers read them in place, without copying into memory or temp files.
+
+def upload_name(file):
+    """Original filename of an upload, or the basename of an opened file."""
+    name = getattr(file, 'filename', None) or getattr(file, 'name', '')
+    return os.path.basename(str(name))
+
+def upload_stream(file):
+    """Underlying seekable binary stream (the spooled file for FileStorage)."""
+    return getattr(file, 'stream', file)
+
+def sniff_separator(stream):
+    """Picks tab or comma from the header line, leaving the stream where it was."""
+    pos = stream.tell()
+    header = stream.readline()
+    stream.seek(pos)
+    tab = b'\t' if isinstance(header, bytes) else '\t'
+    return '\t' if tab in header else ','
+
+def read_delimited_upload(file, **kwargs):
+    """Reads a CSV/TSV upload in a single pass straight from its stream."""
+    stream = upload_stream(file)
+    start = stream.tell()
+    sep = sniff_separator(stream)
+    try:
+        return pd.read_csv(stream, sep=sep, **kwargs)
+    except Exception:
+        if sep == ',':
+            raise
+        # Header looked like TSV but the body didn't parse; fall back to CSV
+        stream.seek(start)
+        return pd.read_csv(stream, sep=',', **kwargs)
+
+def save_upload(file, folder):
+    """
+    Copies an upload to folder/<its filename>, for work handed to another
+    process (spooled uploads can't be pickled). Returns the path.
+    """
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, upload_name(file) or 'upload')
+    with open(path, 'wb') as out:
+        shutil.copyfileobj(upload_stream(file), out, 1024 * 1024)
+    return path
@@ -2,6 +2,9 @@ import pandas as pd
 import os
 import io
 from datetime import datetime
+from scrapers.uploads import upload_name, read_delimited_upload
+from scrapers.aggregates import save_aggregate
+from scrapers.exporters import export_format, export_tables
 
 def get_travel_type(row):
     o_country = str(row.get('origin_country', '')).strip().upper()
@@ -17,24 +20,18 @@ def get_travel_type(row):
     else:
         return 'International'
 
-def process_weekly_flights(uploaded_files, download_folder):
+def process_weekly_flights(uploaded_files, download_folder, fmt='xlsx'):
     """
-    uploaded_files: List of FileStorage objects
+    uploaded_files: List of FileStorage objects (or binary file objects)
+    fmt: 'xlsx', 'parquet' or 'csv.gz'
     """
     summary_data = []
 
     for file in uploaded_files:
-        filename = file.filename
+        filename = upload_name(file)
         try:
-            # 1. Read File
-            try:
-                temp_df = pd.read_csv(file, sep='\t')
-                if temp_df.shape[1] < 2:
-                    file.seek(0)
-                    temp_df = pd.read_csv(file, sep=',')
-            except:
-                file.seek(0)
-                temp_df = pd.read_csv(file, sep=',')
+            # 1. Read File (single pass from the spooled upload)
+            temp_df = read_delimited_upload(file)
             
             # Clean Headers
             temp_df.columns = temp_df.columns.str.strip().str.lower()
@@ -84,7 +81,13 @@ def process_weekly_flights(uploaded_files, download_folder):
     final_summary_df = final_summary_df.sort_values('SortDate').drop(columns=['SortDate'])
 
     # 7. Save
-    output_filename = f"Weekly_Flight_Summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    stem = f"Weekly_Flight_Summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    save_aggregate('weekly', stem, final_summary_df)
+    fmt = export_format(fmt)
+    if fmt != 'xlsx':
+        return export_tables({'Summary': final_summary_df}, download_folder, stem, fmt)
+
+    output_filename = f"{stem}.xlsx"
     output_path = os.path.join(download_folder, output_filename)
     
     final_summary_df.to_excel(output_path, index=False)
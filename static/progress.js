@@ -0,0 +1,67 @@
+// Live progress for the long tool forms (NIGGRID, cargo manifests).
+// On submit the form posts to ?job_id=<fresh id> and the page listens on
+// /progress/<job_id> (server-sent events) while the POST is running. Until
+// the server has started the job that route answers 204, which closes the
+// EventSource, so we reconnect with a growing delay.
+var PROBLEM_STATUSES = ['missing', 'empty', 'failed']; // Listed under the bar
+var RECONNECT_MS = [250, 500, 1000, 2000, 5000];
+
+function newJobId() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + Math.random().toString(36).slice(2, 12);
+}
+
+function watchProgress(form, unit, onDone) {
+    var jobId = newJobId();
+    var params = new URLSearchParams(window.location.search); // Keep e.g. ?profile=<token>
+    params.set('job_id', jobId);
+    form.action = window.location.pathname + '?' + params.toString();
+
+    var bar = document.getElementById('progressBar');
+    var text = document.getElementById('progressText');
+    var log = document.getElementById('progressLog');
+    bar.style.width = '0%';
+    bar.innerText = '';
+    text.innerText = 'Waiting for the server...';
+    log.innerHTML = '';
+
+    var attempts = 0;
+    var finished = false;
+    function connect() {
+        var source = new EventSource('/progress/' + encodeURIComponent(jobId));
+        source.onmessage = function (e) {
+            attempts = 0;
+            handle(source, JSON.parse(e.data));
+        };
+        source.onerror = function () {
+            // 204 (job not started yet) leaves the source closed; otherwise the browser retries itself
+            if (source.readyState === EventSource.CLOSED && !finished) {
+                setTimeout(connect, RECONNECT_MS[Math.min(attempts++, RECONNECT_MS.length - 1)]);
+            }
+        };
+    }
+
+    function handle(source, ev) {
+        if (ev.event === unit && ev.total) {
+            var pct = Math.round(100 * ev.current / ev.total);
+            bar.style.width = pct + '%';
+            bar.innerText = ev.current + ' / ' + ev.total;
+        }
+        if (ev.message) text.innerText = ev.message;
+        if (ev.event === 'error' || (ev.event === unit && PROBLEM_STATUSES.indexOf(ev.status) >= 0)) {
+            var line = document.createElement('div');
+            line.className = ev.event === 'error' ? 'text-danger' : 'text-muted';
+            line.innerText = ev.message;
+            log.appendChild(line);
+        }
+        if (ev.event === 'done') {
+            finished = true;
+            source.close();
+            bar.style.width = '100%';
+            text.innerText = ev.status === 'ok' ? 'Finished.' : 'Finished (' + ev.status + ').';
+            if (onDone) onDone(ev.status);
+        }
+    }
+
+    connect();
+}
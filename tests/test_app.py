@@ -0,0 +1,17 @@
+import io
+
+import pytest
+
+import app as app_module
+
+@pytest.mark.parametrize('path', ['/flight_data', '/cargo_manifest', '/weekly_flight_data'])
+def test_oversized_upload_reports_the_limits(monkeypatch, path):
+    monkeypatch.setattr(app_module, 'MAX_UPLOAD_FILE_MB', 0) # Every file is too large
+    client = app_module.app.test_client()
+    response = client.post(path, data={'files': (io.BytesIO(b'x' * 1024), 'upload.csv')}, content_type='multipart/form-data')
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        messages = [message for _, message in session.get('_flashes', [])]
+    assert len(messages) == 1
+    assert messages[0].startswith('Upload too large:')
+    assert 'MB per file' in messages[0]
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+import batch
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'w').close()
+    return str(path)
+
+def test_two_directories_for_one_month_are_refused(tmp_path):
+    touch(tmp_path / 'a' / '2025-03' / 'day1.csv')
+    touch(tmp_path / 'b' / '2025-03' / 'day2.csv')
+    paths = [str(tmp_path / 'a' / '2025-03'), str(tmp_path / 'b' / '2025-03')]
+    args = batch.build_parser().parse_args(['flight', *paths, '--out', str(tmp_path / 'out')])
+    with pytest.raises(SystemExit):
+        batch.build_flight_jobs(args)
+
+def test_month_option_with_several_directories_is_refused(tmp_path):
+    touch(tmp_path / 'x' / 'day1.csv')
+    touch(tmp_path / 'y' / 'day2.csv')
+    args = batch.build_parser().parse_args(['flight', str(tmp_path / 'x'), str(tmp_path / 'y'), '--month', '2025-03', '--out', str(tmp_path / 'out')])
+    with pytest.raises(SystemExit):
+        batch.build_flight_jobs(args)
+
+def test_cargo_parts_with_the_same_name_get_distinct_names(tmp_path):
+    first = touch(tmp_path / 'jan' / 'manifest.pdf')
+    second = touch(tmp_path / 'feb' / 'manifest.pdf')
+    other = touch(tmp_path / 'feb' / 'other.pdf')
+    args = batch.build_parser().parse_args(['cargo', str(tmp_path / 'jan'), str(tmp_path / 'feb'), first, '--no-store', '--out', str(tmp_path / 'out')])
+    jobs = batch.build_cargo_jobs(args)
+    names = {job_args[0]: job_args[4] for _, _, job_args in jobs}
+    assert len(jobs) == 3 # The PDF listed twice runs once
+    assert names[other] == 'other.pdf'
+    assert names[first] != names[second]
+    assert all(name.startswith('manifest_') and name.endswith('.pdf') for name in (names[first], names[second]))
+
+def test_failed_jobs_make_the_command_fail(tmp_path):
+    pdf = tmp_path / 'in' / 'corrupt.pdf'
+    os.makedirs(pdf.parent)
+    pdf.write_bytes(b'%PDF-1.4 not really a pdf')
+    assert batch.main(['cargo', str(pdf.parent), '--no-store', '--workers', '1', '--out', str(tmp_path / 'out')]) == 1
+
+def test_sync_fails_while_published_days_are_missing(tmp_path, monkeypatch):
+    from scrapers import niggrid
+    monkeypatch.setattr(niggrid, 'sync_days', lambda days, store_folder: [])
+    assert batch.main(['niggrid-sync', '--start', '2025-01-01', '--end', '2025-01-02', '--store', str(tmp_path)]) == 1
@@ -0,0 +1,91 @@
+import io
+import random
+from datetime import date
+
+import pytest
+
+from benchmarks import synthetic
+from scrapers import cargo_processor
+from scrapers.cargo_processor import discarded_page, parse_pdf
+
+HEAD = ['DAILY SHIPPING POSITION', 'NIGERIAN PORTS AUTHORITY', [''] * 9 + ['DATE: 15-JAN-25'], synthetic.CARGO_FIELD_ROW]
+
+def row(number, position, ship, eta='12-JAN-25', etb='-', receiver='MRS', remarks='AWAITING'):
+    return [str(number), position, ship, 'AGO', '3000', eta, etb, '-', receiver, remarks]
+
+def parse(data, monkeypatch, skip):
+    monkeypatch.setattr(cargo_processor, 'SKIP_DISCARDED_PAGES', skip)
+    return parse_pdf(io.BytesIO(data))
+
+def assert_same_rows(data, monkeypatch):
+    baseline = parse(data, monkeypatch, False)
+    skipped = parse(data, monkeypatch, True)
+    if baseline is None:
+        assert skipped is None
+    else:
+        assert skipped.equals(baseline)
+    return baseline
+
+def test_domestic_row_naming_a_foreign_port_keeps_the_page(monkeypatch):
+    # Untitled continuation of APAPA whose first row has only an ETA and a ship called BENIN
+    data = synthetic._build_pdf([
+        synthetic._page_stream(None, HEAD + ['APAPA JETTY LAT 6.44N', row(1, 'B1', 'MT ALPHA 1', etb='15-JAN-25')]),
+        synthetic._page_stream(None, [row(2, 'B2', 'MT BENIN STAR'), row(3, 'B3', 'MT STAR 4', etb='15-JAN-25'), row(4, 'B4', 'MT GLORY 7', etb='15-JAN-25')]),
+        synthetic._page_stream('TINCAN ISLAND PORT', [synthetic.CARGO_FIELD_ROW, row(5, 'B5', 'MT OCEAN 2'), 'END OF REPORT']),
+    ])
+    df = assert_same_rows(data, monkeypatch)
+    assert len(df) == 5
+    assert list(df.loc[df['Jetty Information'] == 'APAPA JETTY', 'Position']) == ['B1', 'B2', 'B3', 'B4']
+
+@pytest.mark.parametrize('heading', ['IBAKA - AKWA IBOM', 'KIRIKIRI LIGHTER TERMINAL - LAGOS', 'BOP JETTY (15-JAN-25)', '2 NNPC JETTY'])
+def test_domestic_heading_after_a_foreign_continuation_keeps_the_page(monkeypatch, heading):
+    data = synthetic._build_pdf([
+        synthetic._page_stream(None, HEAD + ['APAPA JETTY LAT 6.44N', row(1, 'B1', 'MT ALPHA 1', etb='15-JAN-25')]),
+        synthetic._page_stream('TEMA PORT GHANA', [synthetic.CARGO_FIELD_ROW, row(2, 'B2', 'MT OCEAN 2'), row(3, 'B3', 'MT STAR 4')]),
+        synthetic._page_stream(None, [row(4, 'B4', 'MT GLORY 7'), heading] + [row(n, f'B{n}', f'MT BRAVO {n}', etb='15-JAN-25') for n in (5, 6, 7)]),
+        synthetic._page_stream('TINCAN ISLAND PORT', [synthetic.CARGO_FIELD_ROW, row(8, 'B8', 'MT OCEAN 9'), 'END OF REPORT']),
+    ])
+    df = assert_same_rows(data, monkeypatch)
+    assert list(df['Position']) == ['B1', 'B5', 'B6', 'B7', 'B8']
+
+def test_heading_shapes_are_never_entries():
+    for heading in ['IBAKA - AKWA IBOM', 'KIRIKIRI LIGHTER TERMINAL - LAGOS', 'BOP JETTY (15-JAN-25)', '2 NNPC JETTY']:
+        assert discarded_page(f"4 B4 MT GLORY 7 AGO 3000 12-JAN-25 - - MRS AWAITING\n{heading}", 'TEMA PORT GHANA')[0] is False
+
+def test_row_lines_never_switch_the_jetty():
+    page = "2 B2 MT BENIN STAR AGO 3000 12-JAN-25 - - MRS AWAITING\n3 B3 MT STAR 4 AGO 3000 12-JAN-25 - - MRS AWAITING"
+    assert discarded_page(page, 'APAPA JETTY') == (False, 'APAPA JETTY')
+    # Under a foreign jetty the same rows are dropped, so the page can go
+    assert discarded_page(page, 'TEMA PORT GHANA') == (True, 'TEMA PORT GHANA')
+
+def test_foreign_title_page_is_discarded():
+    page = "LOME PORT TOGO\nNO POSITION SHIP'S NAME CARGO QTY ARRVD ETB SAILED RECEIVERS REMARKS\n" \
+           "31 B19 MT STAR 5 DPK 31000 11-JAN-25 15-JAN-25 - OANDO DISCHARGING\nVACANT -\nPage 2 of 3"
+    assert discarded_page(page, 'APAPA JETTY') == (True, 'LOME PORT TOGO')
+
+def test_domestic_heading_keeps_the_page():
+    page = "TEMA PORT GHANA\n31 B19 MT STAR 5 DPK 31000 11-JAN-25 15-JAN-25 - OANDO DISCHARGING\nONNE PORT\n" \
+           "32 B2 MT STAR 6 DPK 31000 11-JAN-25 15-JAN-25 - OANDO DISCHARGING"
+    assert discarded_page(page, 'TEMA PORT GHANA')[0] is False
+
+def test_single_vacant_cell_keeps_the_page():
+    # A lone VACANT cell is a jetty row to the parser, so later rows are kept
+    assert discarded_page("VACANT\n31 B19 MT STAR 5 DPK 31000 11-JAN-25 15-JAN-25 - OANDO X", 'TEMA PORT GHANA')[0] is False
+
+@pytest.mark.parametrize('seed, foreign_share, vacant_share', [(0, 0.5, 0.1), (1, 0.5, 0.1), (9, 0.3, 0.8)])
+def test_skipping_keeps_synthetic_manifests_identical(monkeypatch, seed, foreign_share, vacant_share):
+    data = synthetic.cargo_manifest_pdf(pages=6, rows_per_page=10, foreign_share=foreign_share, vacant_share=vacant_share, seed=seed)
+    assert_same_rows(data, monkeypatch)
+
+def test_mixed_layouts_identical(monkeypatch):
+    rng = random.Random(5)
+    numbers = iter(range(1, 1000))
+    entry = lambda vacant=False: synthetic._entry_row(rng, next(numbers), date(2025, 1, 15), vacant=vacant)
+    data = synthetic._build_pdf([
+        synthetic._page_stream(None, HEAD + ['APAPA JETTY'] + [entry() for _ in range(3)] + ['TEMA PORT GHANA'] + [entry() for _ in range(3)]),
+        synthetic._page_stream(None, [entry() for _ in range(4)]),
+        synthetic._page_stream(None, [entry() for _ in range(2)] + ['ONNE PORT'] + [entry() for _ in range(3)]),
+        synthetic._page_stream('WARRI OLD PORT', [synthetic.CARGO_FIELD_ROW] + [entry(vacant=True) for _ in range(4)]),
+        synthetic._page_stream('TEMA PORT GHANA', [synthetic.CARGO_FIELD_ROW] + [entry() for _ in range(2)] + ['VACANT'] + [entry() for _ in range(2)] + ['END OF REPORT']),
+    ])
+    assert_same_rows(data, monkeypatch)
@@ -0,0 +1,56 @@
+import io
+
+import pandas as pd
+
+from benchmarks import synthetic
+from scrapers import cargo_store
+from scrapers.cargo_processor import parse_pdf
+
+def manifest(rows):
+    columns = ['Date', 'State', 'Jetty Information', 'Position', "Ship's Name", 'Cargo', 'Quantity [MT]']
+    return pd.DataFrame(rows, columns=columns)
+
+def test_repeated_keys_inside_a_manifest_are_kept(tmp_path):
+    df = manifest([
+        ('2025-01-15', 'Lagos', 'APAPA JETTY', 'B1', 'MT STAR 1', 'PMS', '1000'),
+        ('2025-01-15', 'Lagos', 'APAPA JETTY', 'B1', 'MT STAR 1', 'PMS', '2000'), # Split cargo line
+        ('2025-01-15', 'Lagos', 'APAPA JETTY', 'B2', 'MT OCEAN 3', 'AGO', '500'),
+    ])
+    assert cargo_store.save_manifest('a' * 64, df, 'a.pdf', str(tmp_path)) == (3, 0)
+    assert len(cargo_store.load_master(str(tmp_path))) == 3
+
+def test_revised_manifest_replaces_only_its_keys(tmp_path):
+    folder = str(tmp_path)
+    first = manifest([
+        ('2025-01-15', 'Lagos', 'APAPA JETTY', 'B1', 'MT STAR 1', 'PMS', '1000'),
+        ('2025-01-15', 'Lagos', 'APAPA JETTY', 'B2', 'MT OCEAN 3', 'AGO', '500'),
+    ])
+    revised = manifest([
+        ('2025-01-15', 'Lagos', ' apapa jetty ', 'B1', 'mt star 1', 'PMS', '1500'),
+        ('2025-01-15', 'Lagos', 'APAPA JETTY', 'B1', 'MT STAR 1', 'PMS', '700'),
+        ('2025-01-15', 'Rivers', 'ONNE PORT', 'B7', 'MT GLORY 2', 'DPK', '900'),
+    ])
+    cargo_store.save_manifest('a' * 64, first, 'a.pdf', folder)
+    assert cargo_store.save_manifest('b' * 64, revised, 'b.pdf', folder) == (1, 2)
+
+    master = cargo_store.load_master(folder)
+    assert sorted(master['Quantity [MT]']) == ['1500', '500', '700', '900']
+    assert cargo_store.load_index(folder)['b' * 64]['rows'] == 3
+
+def test_incremental_master_matches_batch_master(tmp_path):
+    parts = [parse_pdf(io.BytesIO(synthetic.cargo_manifest_pdf(pages=2, rows_per_page=12, manifest_date=pd.Timestamp(f'2025-01-{day}').date(), seed=day)))
+             for day in (10, 11, 12)]
+    for i, df in enumerate(parts):
+        cargo_store.save_manifest(str(i) * 64, df, f"{i}.pdf", str(tmp_path))
+    batch = pd.concat(parts, ignore_index=True)
+    master = cargo_store.load_master(str(tmp_path))
+    assert len(master) == len(batch)
+    pd.testing.assert_frame_equal(master, batch.sort_values('Date', kind='stable').reset_index(drop=True))
+
+def test_manifest_digest_of_stream_matches_file_and_keeps_position(tmp_path):
+    data = synthetic.cargo_manifest_pdf(pages=1, rows_per_page=3, seed=1)
+    path = tmp_path / 'm.pdf'
+    path.write_bytes(data)
+    stream = io.BytesIO(data)
+    assert cargo_store.manifest_digest(stream) == cargo_store.manifest_digest(str(path))
+    assert stream.tell() == 0
@@ -0,0 +1,40 @@
+import io
+from datetime import date
+
+import pandas as pd
+
+from benchmarks import synthetic
+from scrapers.flight_processor import DuplicateFilter
+
+KEY = ['flight_id', 'date_takeoff']
+
+def export(day, rows=200, seed=None, sep=','):
+    return pd.read_csv(io.BytesIO(synthetic.flight_export(day, rows=rows, sep=sep, seed=seed)), sep=sep)
+
+def test_matches_drop_duplicates_across_files():
+    files = [export(date(2025, 1, 1), seed=1), export(date(2025, 1, 1), seed=1), export(date(2025, 1, 2), seed=2)]
+    files[2] = pd.concat([files[2], files[0].iloc[:50], files[2].iloc[:10]], ignore_index=True)
+    dedup = DuplicateFilter(KEY)
+    kept = pd.concat([dedup.filter(df, f"day{i}.csv") for i, df in enumerate(files)], ignore_index=True)
+    expected = pd.concat(files, ignore_index=True).drop_duplicates(subset=KEY, ignore_index=True)
+    pd.testing.assert_frame_equal(kept, expected)
+    assert dedup.dropped == 200 + 50 + 10
+
+def test_keys_match_as_stripped_text():
+    dedup = DuplicateFilter(['flight_id'])
+    dedup.filter(pd.DataFrame({'flight_id': [123, 456]}), 'a.csv')
+    kept = dedup.filter(pd.DataFrame({'flight_id': ['123', ' 456 ', '789']}), 'b.csv')
+    assert kept['flight_id'].tolist() == ['789']
+
+def test_files_without_the_key_pass_through():
+    dedup = DuplicateFilter(KEY)
+    df = export(date(2025, 1, 1), rows=20, seed=3).drop(columns='date_takeoff')
+    df = pd.concat([df, df], ignore_index=True)
+    assert dedup.filter(df, 'old_layout.csv') is df
+    assert dedup.unchecked_files == ['old_layout.csv']
+    assert dedup.dropped == 0
+
+def test_empty_key_keeps_everything():
+    df = export(date(2025, 1, 1), rows=20, seed=4)
+    dedup = DuplicateFilter([])
+    assert len(dedup.filter(pd.concat([df, df]), 'a.csv')) == 40
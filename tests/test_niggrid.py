@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from benchmarks.niggrid_standin import render_page
+from scrapers import niggrid, niggrid_scheduler, niggrid_scraper, niggrid_store
+from scrapers.niggrid import ScraperBackend, parse_day_html
+
+DAY = date(2025, 1, 15)
+
+def test_scraped_day_round_trips(tmp_path):
+    df = parse_day_html(render_page('2025/01/15').decode())
+    niggrid_store.save_day(DAY, df, str(tmp_path))
+    assert niggrid_store.has_day(DAY, str(tmp_path))
+    pd.testing.assert_frame_equal(niggrid_store.load_day(DAY, str(tmp_path)), df)
+
+def test_multi_row_and_repeated_headers_survive(tmp_path):
+    columns = pd.MultiIndex.from_tuples([('S/N', ''), ('GENCO', 'Raw_Name'), ('01:00', 'MW'), ('01:00', 'MW')])
+    df = pd.DataFrame([[1, 'EGBIN (STEAM)', 120.5, 118], [2, 'DELTA (GAS)', 80.25, 79]], columns=columns)
+    niggrid_store.save_day(DAY, df, str(tmp_path))
+    pd.testing.assert_frame_equal(niggrid_store.load_day(DAY, str(tmp_path)), df)
+
+def test_days_stored_as_csv_are_still_read(tmp_path):
+    pd.DataFrame({'S/N': [1], 'Raw_Name': ['EGBIN (STEAM)']}).to_csv(niggrid_store.legacy_day_path(DAY, str(tmp_path)), index=False)
+    assert niggrid_store.missing_days([DAY, date(2025, 1, 16)], str(tmp_path)) == [date(2025, 1, 16)]
+    assert niggrid_store.load_day(DAY, str(tmp_path))['Raw_Name'].tolist() == ['EGBIN (STEAM)']
+
+def test_scheduler_takes_the_lock_once_it_is_free(tmp_path, monkeypatch):
+    fcntl = pytest.importorskip('fcntl')
+    monkeypatch.setattr(niggrid_scheduler, '_lock_handle', None)
+    owner = open(tmp_path / '.scheduler.lock', 'w')
+    fcntl.flock(owner, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    assert not niggrid_scheduler._acquire_lock(str(tmp_path))
+    owner.close() # The owning worker exited
+    try:
+        assert niggrid_scheduler._acquire_lock(str(tmp_path))
+        assert niggrid_scheduler._acquire_lock(str(tmp_path)) # Kept on later ticks
+    finally:
+        niggrid_scheduler._lock_handle.close()
+
+@pytest.fixture
+def offline_backend(monkeypatch):
+    sleeps = []
+    clock = [1000.0]
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+    monkeypatch.setattr(niggrid_scraper.time, 'sleep', sleep)
+    monkeypatch.setattr(niggrid_scraper.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(niggrid_scraper, 'POLITE_DELAY', (2.0, 2.0))
+    monkeypatch.setattr(niggrid_scraper, 'get_hidden_fields', lambda session: {'__VIEWSTATE': 'vs'})
+    monkeypatch.setattr(niggrid_scraper, 'post_day', lambda session, fields, date_str: render_page(date_str).decode())
+    backend = niggrid_scraper.HttpBackend()
+    yield backend, sleeps, clock
+    backend.close()
+
+def test_polite_delay_only_between_fetches(offline_backend):
+    backend, sleeps, clock = offline_backend
+    backend.fetch_day_html(DAY)
+    assert sleeps == [] # Nothing before the first fetch or after the last
+    clock[0] += 0.5 # e.g. stored days being read
+    backend.fetch_day_html(date(2025, 1, 16))
+    assert sleeps == [1.5]
+    clock[0] += 5
+    backend.fetch_day_html(date(2025, 1, 17))
+    assert sleeps == [1.5]
+
+def test_backends_must_fetch_days():
+    class Incomplete(ScraperBackend):
+        name = 'incomplete'
+    with pytest.raises(TypeError):
+        Incomplete()
+    assert niggrid_scraper.HttpBackend.__abstractmethods__ == frozenset()
+
+class CountingBackend(ScraperBackend):
+    def __init__(self, name, html):
+        self.name, self.html, self.days = name, html, []
+
+    def fetch_day_html(self, current_date):
+        self.days.append(current_date)
+        return self.html
+
+@pytest.fixture
+def fake_backends(monkeypatch):
+    backends = {'http': CountingBackend('http', '<html><body>No data</body></html>'), 'playwright': CountingBackend('playwright', None)}
+    monkeypatch.setattr(niggrid, 'create_backend', lambda name: backends[name])
+    return backends
+
+def test_days_not_published_yet_never_reach_the_browser(tmp_path, fake_backends):
+    today = date.today()
+    statuses = []
+    niggrid.run_scraper(today.isoformat(), (today + timedelta(days=6)).isoformat(), str(tmp_path / 'out'), str(tmp_path / 'store'),
+                        backend='auto', progress=lambda event, message, **data: statuses.append(data.get('status')) if event == 'day' else None)
+    assert fake_backends['http'].days == [today]
+    assert fake_backends['playwright'].days == []
+    assert statuses == ['unpublished'] * 7
+
+def test_pages_without_a_table_are_not_http_failures(fake_backends):
+    days = [date(2025, 1, d) for d in range(1, 6)]
+    fetcher = niggrid.DayFetcher('auto')
+    assert [fetcher.fetch(d) for d in days] == [None] * 5
+    assert fake_backends['http'].days == days # Still tried first every day
+    assert fake_backends['playwright'].days == days
+
+def test_failed_http_requests_escalate_the_rest_of_the_run(fake_backends):
+    fake_backends['http'].html = None
+    days = [date(2025, 1, d) for d in range(1, 6)]
+    fetcher = niggrid.DayFetcher('auto')
+    for d in days:
+        fetcher.fetch(d)
+    assert fake_backends['http'].days == days[:niggrid.ESCALATE_AFTER_FAILURES]
+    assert fake_backends['playwright'].days == days
@@ -0,0 +1,53 @@
+import asyncio
+import time
+from datetime import date
+
+import pytest
+
+pytest.importorskip('playwright')
+from scrapers import niggrid_scraper_pw as pw
+
+class HangingContext:
+    async def route(self, pattern, handler):
+        pass
+
+    async def new_page(self):
+        await asyncio.sleep(3600) # A page that never loads
+
+    async def close(self):
+        raise AssertionError("a timed-out context should not be waited on")
+
+class FakeBrowser:
+    closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    async def new_context(self, **kwargs):
+        return HangingContext()
+
+    async def close(self):
+        self.closed = True
+
+def test_timed_out_day_raises_and_recycles_the_browser(monkeypatch):
+    browser = FakeBrowser()
+    pool = pw.BrowserPool(size=1)
+
+    async def started():
+        if pool._idle is None:
+            pool._idle = asyncio.Queue()
+            pool._idle.put_nowait([browser, 0])
+    pool._ensure_started = started
+    backend = pw.PlaywrightBackend.__new__(pw.PlaywrightBackend)
+    backend.pool = pool
+    monkeypatch.setattr(pw, 'BROWSER_JOB_TIMEOUT', 0.2)
+    try:
+        with pytest.raises(TimeoutError):
+            backend.fetch_day_html(date(2025, 1, 15))
+        deadline = time.time() + 5
+        while not (browser.closed and pool._idle.qsize() == 1) and time.time() < deadline:
+            time.sleep(0.05)
+        assert browser.closed
+        assert pool._idle.get_nowait() == [None, 0] # Slot is free again, with a fresh browser next time
+    finally:
+        pool.close()
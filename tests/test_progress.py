@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+import uuid
+
+
+from scrapers import progress
+from scrapers.progress import ProgressChannel, job_exists, open_channel, stream_events
+
+JOB = 'job-0123456789'
+
+def events(chunks):
+    """(id, record) of every data message, skipping retry and keepalive lines."""
+    out = []
+    for chunk in chunks:
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n') if not line.startswith(':'))
+        if 'data' in fields:
+            out.append((int(fields['id']), json.loads(fields['data'])))
+    return out
+
+def test_finished_job_replays_and_ends(tmp_path):
+    channel = ProgressChannel(JOB, str(tmp_path))
+    channel('start', 'Collecting 2 day(s)', total=2)
+    channel('day', '2025-01-01: stored', current=1, total=2)
+    channel.close('ok')
+    received = events(stream_events(JOB, folder=str(tmp_path)))
+    assert [e['event'] for _, e in received] == ['start', 'day', 'done']
+    assert [i for i, _ in received] == [1, 2, 3]
+    assert received[-1][1]['status'] == 'ok'
+
+def test_last_event_id_resumes(tmp_path):
+    channel = ProgressChannel(JOB, str(tmp_path))
+    for i in range(1, 4):
+        channel('page', f"Page {i}", current=i, total=3)
+    channel.close('ok')
+    received = events(stream_events(JOB, last_event_id=2, folder=str(tmp_path)))
+    assert [i for i, _ in received] == [3, 4]
+
+def test_stream_wakes_on_each_event(tmp_path, monkeypatch):
+    monkeypatch.setattr(progress, 'PROGRESS_KEEPALIVE', 30) # A missed wake-up would stall the test
+    channel = ProgressChannel(JOB, str(tmp_path))
+    stream = stream_events(JOB, folder=str(tmp_path))
+    next(stream) # retry: line
+
+    def work():
+        for i in range(1, 4):
+            time.sleep(0.1)
+            channel('day', f"Day {i}", current=i, total=3)
+        channel.close('ok')
+    writer = threading.Thread(target=work)
+    started = time.time()
+    writer.start()
+    received = events(stream)
+    writer.join()
+    assert [e['event'] for _, e in received] == ['day', 'day', 'day', 'done']
+    assert time.time() - started < 5
+    assert progress.listener_paths(JOB, str(tmp_path)) == [] # Socket removed with the stream
+
+def test_idle_job_sends_keepalives_then_gives_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(progress, 'PROGRESS_KEEPALIVE', 0.05)
+    monkeypatch.setattr(progress, 'PROGRESS_IDLE_TIMEOUT', 0.2)
+    channel = ProgressChannel(JOB, str(tmp_path))
+    channel('start', 'Receiving upload')
+    chunks = list(stream_events(JOB, folder=str(tmp_path)))
+    assert chunks[0].startswith('retry:')
+    assert any(chunk.startswith(': keepalive') for chunk in chunks)
+    assert [e['event'] for _, e in events(chunks)] == ['start']
+    channel.close('ok')
+
+def test_only_well_formed_job_ids_open_a_channel(tmp_path):
+    assert open_channel(None, str(tmp_path)) is None
+    assert open_channel('../../etc/passwd', str(tmp_path)) is None
+    assert not job_exists(JOB, str(tmp_path))
+    channel = open_channel(JOB, str(tmp_path))
+    assert job_exists(JOB, str(tmp_path))
+    channel.close()
+
+def test_route_answers_before_the_job_starts():
+    from app import app
+    client = app.test_client()
+    assert client.get(f'/progress/{uuid.uuid4().hex}').status_code == 204 # EventSource closes; the page retries
+    assert client.get('/progress/not..valid').status_code == 400
+
+def test_long_progress_folder_still_gets_a_socket(tmp_path):
+    folder = tmp_path / ('very_long_folder_name_' * 6) / 'progress'
+    channel = ProgressChannel(JOB, str(folder))
+    stream = stream_events(JOB, folder=str(folder))
+    next(stream)
+    channel('start', 'Receiving upload')
+    assert events([next(stream)])[0][1]['event'] == 'start'
+    assert len(progress.listener_paths(JOB, str(folder))) == 1 # Bound, not the timed fallback
+    channel.close('ok')
+    assert [e['event'] for _, e in events(stream)] == ['done']
+
+def test_fallback_without_a_socket_still_times_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(progress, 'socket_folder', lambda folder: str(tmp_path / ('x' * 120))) # Too long to bind
+    monkeypatch.setattr(progress, 'PROGRESS_KEEPALIVE', 0.05)
+    monkeypatch.setattr(progress, 'PROGRESS_IDLE_TIMEOUT', 0.3)
+    monkeypatch.setattr(progress, 'PROGRESS_FALLBACK_WAIT', 0.02)
+    channel = ProgressChannel(JOB, str(tmp_path))
+    channel('start', 'Collecting 3 day(s)', total=3) # The worker is killed before close()
+    started = time.time()
+    chunks = list(stream_events(JOB, folder=str(tmp_path)))
+    assert time.time() - started < 3
+    assert sum(chunk.startswith(': keepalive') for chunk in chunks) >= 2
+    assert [e['event'] for _, e in events(chunks)] == ['start']
@@ -0,0 +1,36 @@
+import io
+from datetime import date
+
+import pandas as pd
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from benchmarks import synthetic
+from scrapers.uploads import read_delimited_upload, sniff_separator
+
+DAY = date(2025, 1, 15)
+
+@pytest.mark.parametrize('sep', [',', '\t'])
+def test_sniff_separator_leaves_the_stream_in_place(sep):
+    stream = io.BytesIO(b'junk\n' + synthetic.flight_export(DAY, rows=5, sep=sep))
+    stream.readline()
+    assert sniff_separator(stream) == sep
+    assert stream.tell() == 5
+
+def test_sniff_separator_reads_text_streams():
+    assert sniff_separator(io.StringIO('a\tb\n1\t2\n')) == '\t'
+    assert sniff_separator(io.StringIO('a,b\n1,2\n')) == ','
+
+@pytest.mark.parametrize('sep, filename', [(',', 'flights.csv'), ('\t', 'flights.tsv')])
+def test_upload_reads_like_the_file(sep, filename):
+    data = synthetic.flight_export(DAY, rows=50, sep=sep, seed=7)
+    upload = FileStorage(stream=io.BytesIO(data), filename=filename)
+    df = read_delimited_upload(upload, dtype=str)
+    pd.testing.assert_frame_equal(df, pd.read_csv(io.BytesIO(data), sep=sep, dtype=str))
+    assert list(df.columns) == synthetic.FLIGHT_COLUMNS
+
+def test_tab_in_a_csv_header_falls_back_to_comma():
+    stream = io.BytesIO(b'note\tx,flight_id\n1\t1\n1,2\t3\t4\t5\n') # Ragged as TSV
+    df = read_delimited_upload(stream)
+    assert list(df.columns) == ['note\tx', 'flight_id']
+    assert len(df) == 2